@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import ast
+import asyncio
+import concurrent.futures
+import contextvars
+import inspect
+import signal
+import threading
+from functools import lru_cache
+from typing import Any, Coroutine, Dict, MutableMapping, Union
+
+
+class AsyncRunner:
+    """
+    Event loop running on its own daemon thread. Shell coroutines run here rather than
+    on Textual's loop, so they can't block or be blocked by the UI's event handling.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="django-tui-async", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        if hasattr(signal, "pthread_sigmask") and hasattr(signal, "SIGPROF"):
+            # The profiler's SIGPROF must reach the main thread, which samples this one too
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGPROF})
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine) -> Any:
+        """
+        Run the coroutine to completion and return its result. The coroutine sees the
+        caller's context variables, e.g. the database alias selected for the run.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def copy_result(task: asyncio.Task) -> None:
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def schedule() -> None:
+            # Tasks copy the current context, which is the caller's here
+            self.loop.create_task(coro).add_done_callback(copy_result)
+
+        self.loop.call_soon_threadsafe(schedule, context=contextvars.copy_context())
+        return future.result()
+
+
+@lru_cache
+def get_async_runner():
+    """
+    Return the session wide loop for shell coroutines, started on first use
+    """
+    return AsyncRunner()
+
+
+def exec_code(
+    source: Union[str, ast.Module],
+    globals_: Dict[str, Any],
+    locals_: MutableMapping[str, Any],
+) -> None:
+    """
+    Execute source like exec(), additionally allowing top level await, async for and async with.
+    Code that needs awaiting runs on the session's own event loop.
+    """
+    filename = "<string>" if isinstance(source, str) else "<input>"
+    code = compile(source, filename, "exec", flags=ast.PyCF_ALLOW_TOP_LEVEL_AWAIT)
+    if code.co_flags & inspect.CO_COROUTINE:
+        get_async_runner().run(eval(code, globals_, locals_))
+    else:
+        exec(code, globals_, locals_)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import List, Tuple
+
+from textual import events, messages
+from textual.app import App
+from textual.message import Message
+
+
+@dataclass
+class Step:
+    # Keys as accepted by Pilot.press, e.g. "down", "ctrl+r" or "a"
+    keys: List[str]
+    label: str = ""
+
+
+@dataclass
+class Script:
+    steps: List[Step] = field(default_factory=list)
+    size: Tuple[int, int] = (120, 40)
+    # Start in the shell instead of the command builder
+    shell: bool = False
+
+    @classmethod
+    def load(cls, path: str) -> Script:
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            steps=[Step(**step) for step in data["steps"]],
+            size=tuple(data.get("size", (120, 40))),
+            shell=data.get("shell", False),
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+
+class Recorder:
+    """
+    Records the keys pressed in an app as script steps. Consecutive printable
+    keys become one typing step, every other key a step of its own.
+    """
+
+    def __init__(self, size: Tuple[int, int], open_shell: bool = False):
+        self.script = Script(size=size, shell=open_shell)
+        self.typing = False
+
+    def record(self, event: events.Key) -> None:
+        if event.is_printable and event.key != "enter":
+            if self.typing:
+                step = self.script.steps[-1]
+                step.keys.append(event.key)
+                step.label += event.character or ""
+                return
+            self.typing = True
+            self.script.steps.append(Step(keys=[event.key], label=event.character or ""))
+        else:
+            self.typing = False
+            self.script.steps.append(Step(keys=[event.key], label=event.key))
+
+
+class RepaintCounter:
+    """
+    Counts the repaints widgets ask their screen for, passed to App.run_test as
+    its message hook. Headless apps process these messages too.
+    """
+
+    REPAINT_MESSAGES = (messages.Update, messages.Layout, messages.UpdateScroll)
+
+    def __init__(self):
+        self.repaints = 0
+
+    def __call__(self, message: Message) -> None:
+        if isinstance(message, self.REPAINT_MESSAGES):
+            self.repaints += 1
+
+    def take(self) -> int:
+        """
+        Return the repaints requested since the last call
+        """
+        repaints, self.repaints = self.repaints, 0
+        return repaints
+
+
+@dataclass
+class StepTiming:
+    label: str
+    # Seconds until the app was idle again after the keys were pressed
+    latency: float
+    # Repaints widgets requested on the way
+    repaints: int
+
+
+@dataclass
+class ReplayReport:
+    startup: StepTiming
+    steps: List[StepTiming] = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        return self.startup.latency + sum(step.latency for step in self.steps)
+
+    def over_budget(self, seconds: float) -> List[StepTiming]:
+        return [step for step in [self.startup, *self.steps] if step.latency > seconds]
+
+    def summary(self) -> str:
+        width = max(len(step.label) for step in [self.startup, *self.steps])
+        lines = [f"{'Step':<{width}}  {'Latency':>10}  {'Repaints':>8}"]
+        for step in [self.startup, *self.steps]:
+            lines.append(f"{step.label:<{width}}  {step.latency * 1000:>7.1f} ms  {step.repaints:>8}")
+        lines.append(f"{'Total':<{width}}  {self.total * 1000:>7.1f} ms")
+        return "\n".join(lines)
+
+
+async def replay(app: App, script: Script) -> ReplayReport:
+    """
+    Run app headless, press the keys of every step and time how long the app takes
+    to become idle again, including the workers the keys started, and how many
+    repaints it requests on the way
+    """
+    counter = RepaintCounter()
+    started = perf_counter()
+    async with app.run_test(size=script.size, message_hook=counter) as pilot:
+        await pilot.pause()
+        report = ReplayReport(startup=StepTiming("startup", perf_counter() - started, counter.take()))
+        for step in script.steps:
+            started = perf_counter()
+            await pilot.press(*step.keys)
+            await pilot.pause()
+            # e.g. shell code runs in a thread worker and renders once it is done
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            report.steps.append(StepTiming(step.label or " ".join(step.keys), perf_counter() - started, counter.take()))
+    return report
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Any, Iterator, Optional
+
+# A context variable rather than a thread local, so coroutines the shell runs on
+# its own event loop print into the buffer of the run that started them
+_buffer: ContextVar[Optional[IO[str]]] = ContextVar("django_tui_stdout", default=None)
+
+
+class ContextStdout:
+    """
+    Stream that sends the writes of a context capturing its output, see
+    capture_stdout(), to that context's buffer, and everything else to the
+    wrapped stream
+    """
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+
+    def _target(self) -> IO[str]:
+        return _buffer.get() or self.stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def isatty(self) -> bool:
+        return self._target().isatty()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+def install_stdout() -> None:
+    """
+    Put a ContextStdout in front of sys.stdout, unless there is one already. Call it
+    on the main thread before code runs, e.g. when the shell is mounted.
+    """
+    if not isinstance(sys.stdout, ContextStdout):
+        sys.stdout = ContextStdout(sys.stdout)
+
+
+@contextmanager
+def capture_stdout(buf: IO[str]) -> Iterator[IO[str]]:
+    """
+    Send what the current context prints to buf. Other threads keep printing
+    where they did, sys.stdout itself isn't swapped.
+    """
+    # In case something replaced sys.stdout since it was installed, e.g. a test runner
+    install_stdout()
+    token = _buffer.set(buf)
+    try:
+        yield buf
+    finally:
+        _buffer.reset(token)
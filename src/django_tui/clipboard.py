@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import base64
+import os
+import queue
+import shutil
+import sys
+import threading
+from functools import lru_cache
+from subprocess import run
+from typing import List, Optional, Tuple
+
+from textual.app import App
+
+# Terminals and multiplexers commonly drop OSC 52 sequences above ~100 KB of base64
+OSC52_LIMIT = 74_994
+
+
+def osc52_size(text: str) -> int:
+    """
+    Return the size of the OSC 52 payload for text, base64 of its UTF-8 bytes
+    """
+    return len(base64.b64encode(text.encode("utf-8")))
+
+
+def clipboard_command() -> Optional[List[str]]:
+    """
+    Return the platform's clipboard command, None if none is installed
+    """
+    if sys.platform == "win32":
+        candidates = [["clip"]]
+    elif sys.platform == "darwin":
+        candidates = [["pbcopy"]]
+    else:
+        candidates = [["xclip", "-selection", "clipboard"], ["xsel", "--clipboard", "--input"]]
+        if os.environ.get("WAYLAND_DISPLAY"):
+            candidates.insert(0, ["wl-copy"])
+    for command in candidates:
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+class ClipboardService:
+    """
+    Copies text to the clipboard for every screen of the app, without blocking the UI.
+
+    Text goes through the terminal with OSC 52 by default. Text larger than terminals
+    accept, or everything when DJANGO_TUI_CLIPBOARD=command, is piped to the platform's
+    clipboard command by a long-lived worker thread, so there is never a process
+    spawned on the UI thread.
+    """
+
+    def __init__(self, app: App, mode: Optional[str] = None):
+        self.app = app
+        self.mode = mode or os.environ.get("DJANGO_TUI_CLIPBOARD", "osc52")
+        self.command = clipboard_command()
+        self.jobs: queue.Queue[Tuple[str, str]] = queue.Queue()
+        self.worker: Optional[threading.Thread] = None
+
+    def copy(self, text: str, message: str) -> None:
+        """
+        Copy text and notify with message once it's on the clipboard
+        """
+        if self.mode != "command" and osc52_size(text) <= OSC52_LIMIT:
+            self.app.copy_to_clipboard(text)
+            self.app.notify(message)
+            return
+        if self.command is None:
+            if self.mode == "command":
+                self.app.notify("Could not copy to clipboard. No clipboard command found.", severity="error")
+                return
+            # Nothing better available, the terminal might still accept it
+            self.app.copy_to_clipboard(text)
+            self.app.notify(f"{message} Large copies may be truncated by the terminal.", severity="warning")
+            return
+        self.jobs.put((text, message))
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name="django-tui-clipboard", daemon=True)
+            self.worker.start()
+
+    def _work(self) -> None:
+        while True:
+            text, message = self.jobs.get()
+            # Only the most recent copy matters
+            while not self.jobs.empty():
+                text, message = self.jobs.get()
+            try:
+                run(self.command, input=text, text=True, check=False)
+            except OSError as e:
+                self._notify(f"Could not copy to clipboard: {e}", "error")
+            else:
+                self._notify(message, "information")
+
+    def _notify(self, message: str, severity: str) -> None:
+        try:
+            self.app.call_from_thread(self.app.notify, message, severity=severity)
+        except RuntimeError:
+            # The app has exited
+            pass
+
+
+@lru_cache(maxsize=1)
+def get_clipboard(app: App) -> ClipboardService:
+    """
+    Return the clipboard service shared by all screens of the app
+    """
+    return ClipboardService(app)
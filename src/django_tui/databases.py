@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+# A context variable rather than a thread local, so the alias also applies to
+# async ORM calls which run in asgiref's executor thread
+_alias: ContextVar[Optional[str]] = ContextVar("django_tui_alias", default=None)
+
+
+class AliasRouter:
+    """
+    Database router that sends all queries of the current context to the alias
+    selected with `use_database`. Without a selected alias it falls through to the
+    routers configured in settings.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _alias.get()
+
+    def db_for_write(self, model, **hints):
+        return _alias.get()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+_alias_router = AliasRouter()
+
+
+def get_aliases() -> List[str]:
+    """
+    Return database aliases defined in settings.DATABASES
+    """
+    return list(connections)
+
+
+def install_router() -> None:
+    """
+    Put the alias router in front of the routers configured in settings
+    """
+    if _alias_router not in router.routers:
+        router.routers.insert(0, _alias_router)
+
+
+def ensure_usable(alias: str) -> None:
+    """
+    Health check for persistent connections. A connection that went away since
+    the last run is closed, so the next query transparently reconnects.
+    """
+    connection = connections[alias]
+    if connection.connection is not None and not connection.is_usable():
+        connection.close()
+
+
+@contextmanager
+def use_database(alias: Optional[str] = None, rollback: bool = False) -> Iterator[None]:
+    """
+    Route the queries of the current context to the given alias. With rollback,
+    everything runs in a transaction that is rolled back at the end. Without an
+    alias, routers may send writes anywhere, so every database gets a transaction.
+    The transactions belong to the calling thread's connections, so they don't
+    cover async ORM calls.
+    """
+    if rollback:
+        aliases = [alias] if alias else get_aliases()
+    else:
+        aliases = [alias or DEFAULT_DB_ALIAS]
+    for using in aliases:
+        ensure_usable(using)
+    install_router()
+    token = _alias.set(alias)
+    try:
+        if rollback:
+            with ExitStack() as stack:
+                for using in aliases:
+                    stack.enter_context(transaction.atomic(using=using))
+                yield
+                for using in aliases:
+                    transaction.set_rollback(True, using=using)
+        else:
+            yield
+    finally:
+        _alias.reset(token)
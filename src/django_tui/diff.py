@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from rich.syntax import Syntax
+from textual import work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical, VerticalScroll
+from textual.screen import ModalScreen
+from textual.widgets import Label, Static
+
+# (tag, old start, old end, new start, new end), tag is equal, delete or insert
+Opcode = Tuple[str, int, int, int, int]
+
+# Past this many edits the middle of the inputs is reported as replaced wholesale,
+# Myers is O((N + M) * D) and a completely different output is not worth tracing
+MAX_EDITS = 2000
+
+# Lines of diff shown at most, rendering is the slow part for huge outputs
+MAX_DIFF_LINES = 5000
+
+
+def intern_lines(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """
+    Replace lines with small integers, equal lines get the same number,
+    so the diff compares ints instead of strings
+    """
+    ids: Dict[str, int] = {}
+    return [ids.setdefault(line, len(ids)) for line in a], [ids.setdefault(line, len(ids)) for line in b]
+
+
+def _myers(a: Sequence[int], b: Sequence[int], max_edits: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Return the (old index, new index) pairs of equal lines of the shortest edit
+    script, None if it needs more than max_edits edits
+    """
+    n, m = len(a), len(b)
+    offset = n + m + 1
+    # v[offset + k] is the furthest x reached on diagonal k
+    v = [0] * (2 * offset + 1)
+    # Only the diagonals reachable with d edits are kept for backtracking
+    trace = []
+    for d in range(min(n + m, max_edits) + 1):
+        trace.append(v[offset - d : offset + d + 1])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[List[int]], n: int, m: int) -> List[Tuple[int, int]]:
+    x, y = n, m
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1 + d] < v[k + 1 + d]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k + d] if d else 0
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+
+def diff_lines(a: Sequence[str], b: Sequence[str], max_edits: int = MAX_EDITS) -> List[Opcode]:
+    """
+    Return opcodes that turn lines a into lines b, using Myers' algorithm on interned lines
+    """
+    # Common prefix and suffix are cheap to strip and usually most of the output
+    prefix = 0
+    while prefix < len(a) and prefix < len(b) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < len(a) - prefix and suffix < len(b) - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    a_ids, b_ids = intern_lines(a[prefix : len(a) - suffix], b[prefix : len(b) - suffix])
+    matches = _myers(a_ids, b_ids, max_edits)
+    if matches is None:
+        matches = []
+
+    opcodes: List[Opcode] = []
+
+    def add(tag: str, i1: int, i2: int, j1: int, j2: int) -> None:
+        if i1 == i2 and j1 == j2:
+            return
+        if opcodes and opcodes[-1][0] == tag:
+            opcodes[-1] = (tag, opcodes[-1][1], i2, opcodes[-1][3], j2)
+        else:
+            opcodes.append((tag, i1, i2, j1, j2))
+
+    add("equal", 0, prefix, 0, prefix)
+    i = j = prefix
+    for x, y in matches:
+        old, new = x + prefix, y + prefix
+        add("delete", i, old, j, j)
+        add("insert", old, old, j, new)
+        add("equal", old, old + 1, new, new + 1)
+        i, j = old + 1, new + 1
+    add("delete", i, len(a) - suffix, j, j)
+    add("insert", len(a) - suffix, len(a) - suffix, j, len(b) - suffix)
+    add("equal", len(a) - suffix, len(a), len(b) - suffix, len(b))
+    return opcodes
+
+
+def unified_diff(a: Sequence[str], b: Sequence[str], opcodes: List[Opcode], context: int = 3) -> Iterator[str]:
+    """
+    Render opcodes as unified diff hunks
+    """
+    changes = [index for index, opcode in enumerate(opcodes) if opcode[0] != "equal"]
+    if not changes:
+        return
+    # Group changes whose surrounding context overlaps into one hunk
+    groups = [[changes[0]]]
+    for index in changes[1:]:
+        between = opcodes[groups[-1][-1] + 1 : index]
+        if sum(op[2] - op[1] for op in between) > 2 * context:
+            groups.append([index])
+        else:
+            groups[-1].append(index)
+    for group in groups:
+        first, last = opcodes[group[0]], opcodes[group[-1]]
+        i1, j1 = max(first[1] - context, 0), max(first[3] - context, 0)
+        i2, j2 = min(last[2] + context, len(a)), min(last[4] + context, len(b))
+        yield f"@@ -{i1 + 1},{i2 - i1} +{j1 + 1},{j2 - j1} @@"
+        for tag, o1, o2, n1, n2 in opcodes[group[0] - 1 if group[0] else 0 : group[-1] + 2]:
+            if tag == "equal":
+                lo, hi = max(o1, i1), min(o2, i2)
+                yield from (f" {line}" for line in a[lo:hi])
+            elif tag == "delete":
+                yield from (f"-{line}" for line in a[o1:o2])
+            else:
+                yield from (f"+{line}" for line in b[n1:n2])
+
+
+@dataclass
+class OutputRecord:
+    code: str
+    out: str
+    created_at: float = field(default_factory=time.time)
+
+
+class OutputHistory:
+    """
+    The outputs of the last shell runs, bounded by count and by total size
+    """
+
+    def __init__(self, max_entries: int = 10, max_chars: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.records: Deque[OutputRecord] = deque()
+        self.chars = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def append(self, code: str, out: str) -> None:
+        self.records.append(OutputRecord(code=code, out=out))
+        self.chars += len(out)
+        # Always keep the latest two, they are what gets compared
+        while len(self.records) > 2 and (len(self.records) > self.max_entries or self.chars > self.max_chars):
+            self.chars -= len(self.records.popleft().out)
+
+    def get(self, back: int) -> Optional[OutputRecord]:
+        """
+        Return the record of back runs ago, 0 for the latest
+        """
+        if back >= len(self.records):
+            return None
+        return self.records[-1 - back]
+
+
+@lru_cache
+def get_output_history() -> OutputHistory:
+    """
+    Return the session wide history of shell outputs
+    """
+    return OutputHistory()
+
+
+class DiffScreen(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+        Binding("left", "compare(1)", "Older run"),
+        Binding("right", "compare(-1)", "Newer run"),
+    ]
+
+    DEFAULT_CSS = """
+    DiffScreen {
+        align: center middle;
+    }
+
+    DiffScreen > Vertical {
+        width: 90%;
+        height: 90%;
+        border: thick $primary 50%;
+        background: $surface;
+        padding: 0 1;
+    }
+
+    #diff-summary {
+        padding: 1 0;
+    }
+    """
+
+    def __init__(
+        self,
+        history: OutputHistory,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.history = history
+        # How many runs back the compared run is
+        self.back = 1
+        super().__init__(name, id, classes)
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Label("", id="diff-summary")
+            with VerticalScroll():
+                yield Static("", id="diff-body")
+
+    def on_mount(self) -> None:
+        self._show_diff()
+
+    def action_compare(self, step: int) -> None:
+        back = self.back + step
+        if 1 <= back < len(self.history):
+            self.back = back
+            self._show_diff()
+
+    def _show_diff(self) -> None:
+        latest, older = self.history.get(0), self.history.get(self.back)
+        if latest is None or older is None:
+            self.query_one("#diff-summary", Label).update("Run some code twice to compare outputs.")
+            return
+        self.query_one("#diff-summary", Label).update("Comparing...")
+        self._compare(older, latest, "the previous run" if self.back == 1 else f"{self.back} runs ago")
+
+    @work(thread=True, exclusive=True)
+    def _compare(self, older: OutputRecord, latest: OutputRecord, label: str) -> None:
+        a, b = older.out.splitlines(), latest.out.splitlines()
+        opcodes = diff_lines(a, b)
+        deleted = sum(o2 - o1 for tag, o1, o2, _, _ in opcodes if tag == "delete")
+        inserted = sum(n2 - n1 for tag, _, _, n1, n2 in opcodes if tag == "insert")
+        if not deleted and not inserted:
+            self.app.call_from_thread(
+                self._show_diff_result, f"[green]Output is identical to {label}[/] ({len(b)} lines)", ""
+            )
+            return
+        lines = []
+        for line in unified_diff(a, b, opcodes):
+            if len(lines) == MAX_DIFF_LINES:
+                lines.append(f"... diff truncated to {MAX_DIFF_LINES} lines")
+                break
+            lines.append(line)
+        summary = f"Compared to {label}: [red]-{deleted}[/] [green]+{inserted}[/] lines"
+        self.app.call_from_thread(self._show_diff_result, summary, "\n".join(lines))
+
+    def _show_diff_result(self, summary: str, diff: str) -> None:
+        if not self.is_attached:
+            return
+        self.query_one("#diff-summary", Label).update(summary)
+        self.query_one("#diff-body", Static).update(
+            Syntax(diff, "diff", theme="dracula", word_wrap=False) if diff else ""
+        )
@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import csv
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import FieldError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Field, QuerySet
+from django.db.models.query import ModelIterable, ValuesIterable
+from rich.markup import escape
+from textual import on
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Button, Input, Label, ProgressBar, Select, Static
+
+from django_tui.databases import use_database
+from django_tui.metrics import format_bytes
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Called with rows written so far, total rows and bytes written
+ProgressCallback = Callable[[int, int, int], None]
+
+# The model field or annotation output field behind every column, None where it isn't known
+ColumnFields = Dict[str, Optional[Field]]
+
+# Decimals with more digits don't fit pyarrow's decimal128 and are inferred instead
+MAX_DECIMAL128_DIGITS = 38
+
+INTEGER_FIELDS = {
+    "AutoField",
+    "BigAutoField",
+    "SmallAutoField",
+    "IntegerField",
+    "BigIntegerField",
+    "SmallIntegerField",
+    "PositiveIntegerField",
+    "PositiveSmallIntegerField",
+    "PositiveBigIntegerField",
+}
+
+STRING_FIELDS = {
+    "CharField",
+    "TextField",
+    "SlugField",
+    "EmailField",
+    "URLField",
+    "FilePathField",
+    "FileField",
+    "ImageField",
+    "GenericIPAddressField",
+    "IPAddressField",
+}
+
+
+class CsvWriter:
+    def __init__(self, path: str, columns: List[str], fields: Optional[ColumnFields] = None):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self.writer.writerows(row.values() for row in rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class NdjsonWriter:
+    def __init__(self, path: str, columns: List[str], fields: Optional[ColumnFields] = None):
+        self.file = open(path, "w")
+        self.encoder = DjangoJSONEncoder()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self.file.writelines(self.encoder.encode(row) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def parquet_type(pyarrow: Any, field: Optional[Field]) -> Any:
+    """
+    Return the pyarrow type of a column holding the values of field and the function
+    that converts them, or None for fields whose type has to be inferred from the rows
+    """
+    if field is None:
+        return None
+    # Foreign keys hold the values of the field they point to
+    while field.is_relation and (field.many_to_one or field.one_to_one):
+        field = field.target_field
+    internal_type = field.get_internal_type()
+    if internal_type in INTEGER_FIELDS:
+        return pyarrow.int64(), None
+    if internal_type in STRING_FIELDS:
+        return pyarrow.string(), None
+    if internal_type == "BooleanField":
+        return pyarrow.bool_(), None
+    if internal_type == "FloatField":
+        return pyarrow.float64(), None
+    if internal_type == "DecimalField" and field.max_digits and field.max_digits <= MAX_DECIMAL128_DIGITS:
+        return pyarrow.decimal128(field.max_digits, field.decimal_places or 0), None
+    if internal_type == "DateField":
+        return pyarrow.date32(), None
+    if internal_type == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC" if settings.USE_TZ else None), None
+    if internal_type == "TimeField":
+        return pyarrow.time64("us"), None
+    if internal_type == "DurationField":
+        return pyarrow.duration("us"), None
+    if internal_type == "UUIDField":
+        return pyarrow.string(), str
+    if internal_type == "JSONField":
+        return pyarrow.string(), DjangoJSONEncoder().encode
+    if internal_type == "BinaryField":
+        return pyarrow.binary(), bytes
+    return None
+
+
+class ParquetWriter:
+    """
+    Writes every chunk as a row group. Column types come from the model fields,
+    columns without a known field get the type of their values in the first chunk.
+    """
+
+    def __init__(self, path: str, columns: List[str], fields: Optional[ColumnFields] = None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            msg = "Parquet export needs pyarrow, install it with `pip install pyarrow`"
+            raise RuntimeError(msg) from e
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.path = path
+        self.columns = columns
+        self.types = {column: parquet_type(pyarrow, (fields or {}).get(column)) for column in columns}
+        self.writer = None
+
+    def _schema(self, rows: List[Dict[str, Any]]) -> Any:
+        schema = []
+        for column in self.columns:
+            if self.types[column] is None:
+                inferred = self.pyarrow.array([row[column] for row in rows]).type
+                # A column that is all NULL so far can still get any value later
+                self.types[column] = (self.pyarrow.string() if self.pyarrow.types.is_null(inferred) else inferred, None)
+            schema.append((column, self.types[column][0]))
+        return self.pyarrow.schema(schema)
+
+    def _table(self, rows: List[Dict[str, Any]]) -> Any:
+        arrays = []
+        for column in self.columns:
+            values = [row[column] for row in rows]
+            pyarrow_type, convert = self.types[column]
+            if convert is not None:
+                values = [None if value is None else convert(value) for value in values]
+            arrays.append(self.pyarrow.array(values, type=pyarrow_type))
+        return self.pyarrow.Table.from_arrays(arrays, schema=self.writer.schema)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.path, self._schema(rows))
+        self.writer.write_table(self._table(rows))
+
+    def close(self) -> None:
+        if self.writer is None:
+            # No rows, still leave a valid file with the columns behind
+            self.parquet.write_table(self._schema([]).empty_table(), self.path)
+        else:
+            self.writer.close()
+
+
+WRITERS = {
+    "csv": CsvWriter,
+    "ndjson": NdjsonWriter,
+    "parquet": ParquetWriter,
+}
+
+
+@dataclass
+class ExportResult:
+    path: str
+    rows: int
+    size: int
+    seconds: float
+    cancelled: bool = False
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def export_rows(queryset: QuerySet) -> QuerySet:
+    """
+    Return a queryset of the same rows that yields dicts, model instances are
+    never built. Fields of models become their column values, e.g. author_id.
+    """
+    if queryset._iterable_class is ModelIterable:
+        fields = [field.attname for field in queryset.model._meta.concrete_fields]
+        return queryset.values(*fields, *queryset.query.annotation_select)
+    return queryset
+
+
+def column_fields(queryset: QuerySet) -> ColumnFields:
+    """
+    Return the exported columns of queryset, in the order values() returns them,
+    with the field behind every column
+    """
+    query = export_rows(queryset).query
+    fields = dict.fromkeys(query.extra_select)
+    fields.update(zip(query.values_select, (getattr(column, "output_field", None) for column in query.select)))
+    for name, annotation in query.annotation_select.items():
+        try:
+            fields[name] = annotation.output_field
+        except FieldError:
+            # e.g. mixed types without an explicit output_field
+            fields[name] = None
+    return fields
+
+
+def iter_chunks(queryset: QuerySet, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the rows of queryset as lists of dicts of at most chunk_size rows. Rows are
+    fetched with iterator(), which uses server-side cursors where the database has them.
+    """
+    rows = export_rows(queryset)
+    names = None
+    if rows._iterable_class is not ValuesIterable:
+        # values_list(), the names are the selected fields or every selected column
+        names = list(rows._fields) or list(column_fields(rows))
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        if names is None:
+            chunk.append(row)
+        else:
+            chunk.append(dict(zip(names, row if isinstance(row, tuple) else (row,))))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_queryset(
+    queryset: QuerySet,
+    path: str,
+    file_format: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[ProgressCallback] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> ExportResult:
+    """
+    Stream the rows of queryset into a file, holding at most one chunk of rows in memory
+    """
+    started = time.perf_counter()
+    total = queryset.count()
+    chunks = iter_chunks(queryset, chunk_size)
+    first = next(chunks, [])
+    fields = column_fields(queryset)
+    columns = list(first[0]) if first else list(fields)
+    writer = WRITERS[file_format](path, columns, fields)
+    rows = 0
+    try:
+        for chunk in itertools.chain([first] if first else [], chunks):
+            if cancelled is not None and cancelled.is_set():
+                break
+            writer.write(chunk)
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, total, os.path.getsize(path))
+    finally:
+        writer.close()
+    return ExportResult(
+        path=path,
+        rows=rows,
+        size=os.path.getsize(path),
+        seconds=time.perf_counter() - started,
+        cancelled=cancelled is not None and cancelled.is_set(),
+    )
+
+
+class ExportScreen(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+    ]
+
+    DEFAULT_CSS = """
+    ExportScreen {
+        align: center middle;
+    }
+
+    ExportScreen > Vertical {
+        width: 90;
+        height: auto;
+        border: thick $primary 50%;
+        background: $surface;
+        padding: 1 2;
+    }
+
+    ExportScreen Horizontal {
+        height: auto;
+        margin-top: 1;
+    }
+
+    ExportScreen Label {
+        padding: 1 1;
+    }
+
+    ExportScreen Select {
+        width: 20;
+    }
+
+    #export-path {
+        width: 1fr;
+    }
+
+    #export-chunk-size {
+        width: 14;
+    }
+
+    ExportScreen ProgressBar {
+        margin-top: 1;
+    }
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        alias: Optional[str] = None,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.queryset = queryset
+        self.alias = alias
+        self.cancelled = threading.Event()
+        super().__init__(name, id, classes)
+
+    def _default_path(self, file_format: str) -> str:
+        return f"{self.queryset.model._meta.model_name}-{time.strftime('%Y%m%d-%H%M%S')}.{file_format}"
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Static(f"Export [b]{escape(self.queryset.model._meta.label)}[/] rows", id="export-title")
+            with Horizontal():
+                yield Select([(name.upper(), name) for name in WRITERS], value="csv", allow_blank=False)
+                yield Input(self._default_path("csv"), id="export-path")
+            with Horizontal():
+                yield Label("Chunk size")
+                yield Input(str(DEFAULT_CHUNK_SIZE), id="export-chunk-size", type="integer")
+                yield Button("Export", id="export-start", variant="primary")
+                yield Button("Cancel", id="export-cancel", disabled=True)
+            yield ProgressBar(id="export-progress", show_eta=True)
+            yield Static("", id="export-status")
+
+    @on(Select.Changed)
+    def change_format(self, event: Select.Changed) -> None:
+        path = self.query_one("#export-path", Input)
+        root, _ = os.path.splitext(path.value)
+        path.value = f"{root}.{event.value}"
+
+    @on(Button.Pressed, "#export-start")
+    def start_export(self) -> None:
+        file_format = self.query_one(Select).value
+        path = self.query_one("#export-path", Input).value.strip()
+        try:
+            chunk_size = max(int(self.query_one("#export-chunk-size", Input).value or DEFAULT_CHUNK_SIZE), 1)
+        except ValueError:
+            # The integer input still accepts partial values like "-"
+            self.notify("The chunk size must be a whole number.", severity="error")
+            return
+        self.query_one("#export-start", Button).disabled = True
+        self.query_one("#export-cancel", Button).disabled = False
+        self.query_one("#export-status", Static).update("Counting rows...")
+        # An app worker keeps running when this dialog is closed
+        self.app.run_worker(
+            lambda: self._export(path, file_format, chunk_size),
+            thread=True,
+            group="export",
+            description=f"Export to {path}",
+        )
+
+    @on(Button.Pressed, "#export-cancel")
+    def cancel_export(self) -> None:
+        self.cancelled.set()
+
+    def _export(self, path: str, file_format: str, chunk_size: int) -> None:
+        started = time.perf_counter()
+
+        def progress(rows: int, total: int, size: int) -> None:
+            self.app.call_from_thread(self._show_progress, rows, total, size, time.perf_counter() - started)
+
+        try:
+            with use_database(self.alias):
+                result = export_queryset(self.queryset, path, file_format, chunk_size, progress, self.cancelled)
+        except Exception as e:
+            self.app.call_from_thread(self._show_error, path, e)
+        else:
+            self.app.call_from_thread(self._show_result, result)
+        finally:
+            connections.close_all()
+
+    def _show_progress(self, rows: int, total: int, size: int, seconds: float) -> None:
+        if not self.is_attached:
+            return
+        self.query_one(ProgressBar).update(total=total, progress=rows)
+        rate = rows / seconds if seconds else 0
+        self.query_one("#export-status", Static).update(
+            f"{rows:,} of {total:,} rows  ·  {rate:,.0f} rows/s  ·  {format_bytes(size)} written"
+        )
+
+    def _show_error(self, path: str, error: Exception) -> None:
+        self.app.notify(f"Export to {path} failed: {type(error).__name__}: {error}", severity="error")
+        if self.is_attached:
+            self.query_one("#export-start", Button).disabled = False
+            self.query_one("#export-cancel", Button).disabled = True
+            self.query_one("#export-status", Static).update(f"[red]{escape(str(error))}[/]")
+
+    def _show_result(self, result: ExportResult) -> None:
+        summary = (
+            f"{result.rows:,} rows, {format_bytes(result.size)} in {result.seconds:.1f} s "
+            f"({result.rows_per_second:,.0f} rows/s)"
+        )
+        verb = "Cancelled export to" if result.cancelled else "Exported to"
+        self.app.notify(f"{verb} {result.path}: {summary}", severity="warning" if result.cancelled else "information")
+        if self.is_attached:
+            self.query_one(ProgressBar).update(total=max(result.rows, 1), progress=result.rows)
+            self.query_one("#export-cancel", Button).disabled = True
+            self.query_one("#export-status", Static).update(f"{verb} {escape(result.path)}: {summary}")
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import StringIO
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import connections
+from textual import on, work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Button, DataTable, Label, SelectionList
+
+from django_tui.aio import exec_code
+from django_tui.capture import capture_stdout
+from django_tui.databases import get_aliases, use_database
+
+
+@dataclass
+class AliasResult:
+    alias: str
+    status: str
+    out: str
+    elapsed: float
+
+
+def _run_on_alias(
+    code: str,
+    alias: str,
+    globals_: Dict[str, Any],
+    namespace: Dict[str, Any],
+    rollback: bool,
+) -> AliasResult:
+    buf = StringIO()
+    status = "success"
+    start = perf_counter()
+    try:
+        with capture_stdout(buf), use_database(alias, rollback=rollback):
+            exec_code(code, globals_, namespace)
+    except Exception:
+        buf.write(traceback.format_exc())
+        status = "error"
+    finally:
+        elapsed = perf_counter() - start
+        # Every worker thread opens its own connections, don't leave them behind
+        connections.close_all()
+    return AliasResult(alias=alias, status=status, out=buf.getvalue(), elapsed=elapsed)
+
+
+def fan_out(
+    code: str,
+    aliases: List[str],
+    globals_: Dict[str, Any],
+    namespace_factory: Callable[[], Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    rollback: bool = False,
+) -> List[AliasResult]:
+    """
+    Run code concurrently against every alias, each in its own thread with its own
+    connection and a private copy of the namespace. Results keep the order of aliases.
+    With rollback, what the code writes on every alias is rolled back.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or len(aliases) or 1) as executor:
+        futures = [
+            executor.submit(_run_on_alias, code, alias, globals_, namespace_factory(), rollback) for alias in aliases
+        ]
+        return [future.result() for future in futures]
+
+
+class FanOutScreen(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+    ]
+
+    DEFAULT_CSS = """
+    FanOutScreen {
+        align: center middle;
+    }
+
+    FanOutScreen > Vertical {
+        width: 90%;
+        height: 80%;
+        border: thick $primary 50%;
+        background: $surface;
+    }
+
+    FanOutScreen SelectionList {
+        height: auto;
+        max-height: 10;
+    }
+
+    FanOutScreen Horizontal {
+        height: auto;
+    }
+
+    FanOutScreen DataTable {
+        height: 1fr;
+    }
+"""
+
+    def __init__(
+        self,
+        code: str,
+        globals_: Dict[str, Any],
+        namespace_factory: Callable[[], Dict[str, Any]],
+        rollback: bool = False,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.code = code
+        self.globals_ = globals_
+        self.namespace_factory = namespace_factory
+        self.rollback = rollback
+        super().__init__(name, id, classes)
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Label("Run the snippet on the selected databases:")
+            yield SelectionList[str](*((alias, alias, True) for alias in get_aliases()))
+            with Horizontal():
+                yield Button("Run", id="fan-out-run", variant="primary")
+                yield Label("", id="fan-out-summary")
+            yield DataTable(zebra_stripes=True)
+
+    def on_mount(self) -> None:
+        table = self.query_one(DataTable)
+        table.add_columns("Alias", "Status", "Time (ms)", "Output")
+
+    @on(Button.Pressed, "#fan-out-run")
+    def run_fan_out(self) -> None:
+        aliases = self.query_one(SelectionList).selected
+        if not aliases:
+            self.notify("Select at least one database.", severity="warning")
+            return
+        rollback = ", rolling back" if self.rollback else ""
+        self.query_one("#fan-out-summary", Label).update(f"Running on {len(aliases)} database(s){rollback}...")
+        self._fan_out(aliases)
+
+    @work(thread=True, exclusive=True)
+    def _fan_out(self, aliases: List[str]) -> None:
+        start = perf_counter()
+        results = fan_out(self.code, aliases, self.globals_, self.namespace_factory, rollback=self.rollback)
+        self.app.call_from_thread(self._show_results, results, perf_counter() - start)
+
+    def _show_results(self, results: List[AliasResult], elapsed: float) -> None:
+        if not self.is_attached:
+            return
+        table = self.query_one(DataTable)
+        table.clear()
+        for result in results:
+            output = " ⏎ ".join(result.out.strip().splitlines())
+            table.add_row(result.alias, result.status, f"{result.elapsed * 1000:.1f}", output)
+        errors = sum(result.status == "error" for result in results)
+        self.query_one("#fan-out-summary", Label).update(
+            f"{len(results)} database(s) in {elapsed * 1000:.1f} ms, {errors} error(s)"
+        )
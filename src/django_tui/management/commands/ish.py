@@ -1,20 +1,25 @@
 from __future__ import annotations
 
+import ast
 import importlib
+import itertools
 import os
 import platform
+import reprlib
 import sys
 import traceback
 import warnings
+from contextlib import nullcontext
 from functools import lru_cache
 from io import StringIO
-from subprocess import run
-from typing import List, Tuple
+from typing import Any, Iterator, List, Optional, Tuple
 
 import django
 from django.apps import apps
+from django.db.models import Model, QuerySet
 from rich.syntax import Syntax
-from textual import events
+from rich.text import Text
+from textual import events, on, work
 from textual.app import ComposeResult
 from textual.binding import Binding
 from textual.containers import HorizontalScroll, Vertical, VerticalScroll
@@ -24,9 +29,25 @@ from textual.widgets import (
     Label,
     MarkdownViewer,
     TextArea,
+    Tree,
 )
 from textual.widgets.text_area import Location, Selection
 
+from django_tui.aio import exec_code
+from django_tui.capture import capture_stdout, install_stdout
+from django_tui.clipboard import get_clipboard
+from django_tui.databases import get_aliases, use_database
+from django_tui.diff import DiffScreen, get_output_history
+from django_tui.export import ExportScreen
+from django_tui.fanout import FanOutScreen
+from django_tui.memo import ResultCache
+from django_tui.metrics import RunMetrics, format_bytes, measure
+from django_tui.profiler import ProfileScreen, make_profiler
+from django_tui.remote import AttachScreen, RemoteExecutor
+from django_tui.sandbox import SandboxExecutor, SandboxKilledError
+from django_tui.schema import SchemaBrowserScreen
+from django_tui.timing import TimeitScreen
+
 DEFAULT_IMPORT = {
     "rich": ["print_json", "print"],
     "django.db.models": [
@@ -114,35 +135,252 @@ def import_str():
     return "\n".join(buf)
 
 
-def run_code(code):
+@lru_cache
+def get_result_cache():
+    """
+    Return the session wide cache of read-only statement results
+    """
+    return ResultCache()
+
+
+# Name the value of a trailing expression is bound to, like in the Python REPL
+LAST_VALUE = "_"
+
+# Calls whose return value isn't worth binding, only their output is
+OUTPUT_FUNCS = {"print", "print_json", "pprint"}
+
+
+class LastValue:
+    """
+    Remembers the value the shell bound to LAST_VALUE last, so a `_` defined by
+    the user, e.g. gettext imported as _, is never overwritten
+    """
+
+    def __init__(self):
+        self.value = None
+        self.bound = False
+
+    def is_bound(self, scope):
+        """
+        Whether LAST_VALUE in scope is the value the shell bound
+        """
+        return self.bound and LAST_VALUE in scope and scope[LAST_VALUE] is self.value
+
+    def is_free(self, scope):
+        """
+        Whether the shell may bind LAST_VALUE in scope
+        """
+        return LAST_VALUE not in scope or self.is_bound(scope)
+
+    def remember(self, scope):
+        self.bound = LAST_VALUE in scope
+        self.value = scope.get(LAST_VALUE)
+
+
+@lru_cache
+def get_last_value():
+    """
+    Return the session wide record of the value bound to LAST_VALUE
+    """
+    return LastValue()
+
+
+def binds_name(tree, name):
+    """
+    Whether code in tree assigns, imports or defines name anywhere
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store) and node.id == name:
+            return True
+        if isinstance(node, ast.alias) and (node.asname or node.name.split(".")[0]) == name:
+            return True
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == name:
+            return True
+    return False
+
+
+def bind_last_value(code):
+    """
+    Parse code, rewriting a trailing expression into an assignment to LAST_VALUE
+    unless the code binds LAST_VALUE itself
+    """
+    tree = ast.parse(code)
+    if binds_name(tree, LAST_VALUE):
+        return tree
+    last = tree.body[-1] if tree.body else None
+    if isinstance(last, ast.Expr):
+        value = last.value
+        if not (isinstance(value, ast.Call) and isinstance(value.func, ast.Name) and value.func.id in OUTPUT_FUNCS):
+            assign = ast.Assign(targets=[ast.Name(id=LAST_VALUE, ctx=ast.Store())], value=value)
+            tree.body[-1] = ast.fix_missing_locations(ast.copy_location(assign, last))
+    return tree
+
+
+class StreamingIO(StringIO):
+    """
+    Buffers output like StringIO and passes every write on to output as well
+    """
+
+    def __init__(self, output):
+        super().__init__()
+        self.output = output
+
+    def write(self, s):
+        self.output(s)
+        return super().write(s)
+
+
+def run_code(code, cache=None, alias=None, rollback=False, trace_allocations=False, profiler=None, output=None):
     """
     Execute code and return result with status = success|error
-    Function manipulate stdout to grab output from exec
+    Output printed by the run, and only by it, is captured through capture_stdout()
+    When a cache is given, read-only statements are served from it when possible, unless rolling back
+    Queries are routed to the given database alias, and rolled back if rollback is set
+    Resource usage of the execution is recorded in metrics
+    The code runs under the given profiler, if any
+    Top level await is supported, coroutines run on the shell's own event loop
+    The value of a trailing expression is bound to `_` for the object inspector
+    Output is passed on to output as it is printed, if given
     """
     status = "success"
     out = ""
-    tmp_stdout = sys.stdout
-    buf = StringIO()
+    cached = []
+    buf = StringIO() if output is None else StreamingIO(output)
 
     try:
-        sys.stdout = buf
-        exec(code, None, get_scope())
+        with capture_stdout(buf), measure(trace_allocations) as metrics:
+            with use_database(alias, rollback=rollback), profiler or nullcontext():
+                # A `_` the user defined, e.g. gettext, is left alone
+                binds_last_value = get_last_value().is_free(get_scope())
+                tree = bind_last_value(code) if binds_last_value else ast.parse(code)
+                binds_last_value = binds_last_value and not binds_name(tree, LAST_VALUE)
+                # What a rolled back run reads may never have been committed, so it isn't cached
+                if cache is None or rollback:
+                    exec_code(tree, globals(), get_scope())
+                else:
+                    cached = cache.execute(tree, globals(), get_scope(), buf, context=(alias,))
+                if binds_last_value:
+                    get_last_value().remember(get_scope())
     except Exception:
         out = traceback.format_exc()
         status = "error"
     else:
         out = buf.getvalue()
-    finally:
-        sys.stdout = tmp_stdout
 
     result = {
         "code": code,
         "out": out,
         "status": status,
+        "cached": cached,
+        "metrics": metrics,
     }
     return result
 
 
+class LocalExecutor:
+    """
+    Runs shell code in this process
+    """
+
+    description = "local"
+
+    def run(self, code, cache=False, alias=None, rollback=False, trace_allocations=False, profiler=None):
+        return run_code(
+            code,
+            cache=get_result_cache() if cache else None,
+            alias=alias,
+            rollback=rollback,
+            trace_allocations=trace_allocations,
+            profiler=profiler,
+        )
+
+    def close(self) -> None:
+        pass
+
+
+# Children shown per page when expanding a container in the inspector
+INSPECTOR_PAGE_SIZE = 100
+
+# Bounded repr, so a huge container never gets rendered into a huge string
+short_repr = reprlib.Repr()
+short_repr.maxstring = 80
+short_repr.maxother = 80
+short_repr.maxlevel = 1
+
+
+def child_count(value: Any) -> Optional[int]:
+    """
+    Return how many children the inspector shows for value, None for leaves
+    """
+    if isinstance(value, (str, bytes, bytearray, int, float, complex, bool)) or value is None:
+        return None
+    if isinstance(value, QuerySet):
+        # Never evaluate a queryset just to inspect it
+        return None if value._result_cache is None else len(value._result_cache)
+    if isinstance(value, (dict, list, tuple, set, frozenset)):
+        return len(value)
+    if isinstance(value, Model):
+        return len([name for name in vars(value) if name != "_state"])
+    if hasattr(value, "__dict__") and not isinstance(value, type):
+        return len(vars(value)) or None
+    return None
+
+
+def iter_children(value: Any) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (label, child) pairs of value lazily, in the order the inspector shows them
+    """
+    if isinstance(value, QuerySet):
+        value = value._result_cache or []
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield short_repr.repr(key), child
+    elif isinstance(value, (list, tuple)):
+        for index, child in enumerate(value):
+            yield f"[{index}]", child
+    elif isinstance(value, (set, frozenset)):
+        for child in value:
+            yield "", child
+    elif isinstance(value, Model):
+        for name, child in vars(value).items():
+            if name != "_state":
+                yield name, child
+    else:
+        yield from vars(value).items()
+
+
+def deep_size(value: Any, sample: int = 100, max_objects: int = 100_000, max_depth: int = 50) -> Tuple[int, bool]:
+    """
+    Estimate the memory held by value and everything it references through the
+    children the inspector shows. Containers with more than sample children are
+    extrapolated from their first sample children. Return (bytes, exact).
+    """
+    seen = set()
+    exact = True
+
+    def visit(obj: Any, depth: int) -> int:
+        nonlocal exact
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            size += sum(sys.getsizeof(key) for key in itertools.islice(obj, sample))
+        count = child_count(obj)
+        if not count:
+            return size
+        if depth >= max_depth or len(seen) >= max_objects:
+            exact = False
+            return size
+        children = sum(visit(child, depth + 1) for _, child in itertools.islice(iter_children(obj), sample))
+        if count > sample:
+            exact = False
+            children = children * count // sample
+        return size + children
+
+    return visit(value, 0), exact
+
+
 class ExtendedTextArea(TextArea):
     """A subclass of TextArea with parenthesis-closing functionality."""
 
@@ -250,14 +488,195 @@ class DefaultImportsInfo(ModalScreen[None]):
             yield Label(syntax)
 
 
+class RunMetricsInfo(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+    ]
+
+    DEFAULT_CSS = """
+    RunMetricsInfo {
+        align: center middle;
+    }
+"""
+
+    def __init__(
+        self,
+        metrics: RunMetrics,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.metrics = metrics
+        super().__init__(name, id, classes)
+
+    def _markdown(self) -> str:
+        metrics = self.metrics
+        if metrics.cpu_ratio < 0.5:
+            verdict = "Mostly waiting: database or other I/O dominates."
+        else:
+            verdict = "Mostly CPU: Python code dominates."
+        lines = [
+            "Last Run",
+            "| Metric | Value |",
+            "|--------|-------|",
+            f"| Wall time | {metrics.wall * 1000:.2f} ms |",
+            f"| CPU time | {metrics.cpu * 1000:.2f} ms ({metrics.cpu_ratio:.0%} of wall) |",
+            f"| Peak RSS growth | {format_bytes(metrics.rss_delta)} |",
+        ]
+        if metrics.traced_peak is not None:
+            lines.append(f"| Traced peak | {format_bytes(metrics.traced_peak)} |")
+        lines.extend(["", verdict])
+        if metrics.top_allocations:
+            lines.extend(["", "Top Allocations", "| Location | Size | Count |", "|----------|------|-------|"])
+            lines.extend(
+                f"| {location} | {format_bytes(size)} | {count} |" for location, size, count in metrics.top_allocations
+            )
+        else:
+            lines.extend(["", "Enable allocation tracing with F9 to see the top allocating lines."])
+        return "\n".join(lines)
+
+    def compose(self) -> ComposeResult:
+        """Compose the content of the modal dialog."""
+        with Vertical(id="dialog"):
+            yield MarkdownViewer(self._markdown(), classes="spaced", show_table_of_contents=False)
+
+
+class InspectedValue:
+    def __init__(self, value: Any, offset: int = 0):
+        self.value = value
+        # Index of the first child not loaded yet
+        self.offset = offset
+
+
+class ObjectInspector(Tree[InspectedValue]):
+    """
+    Tree of a Python object that loads children a page at a time when a node is
+    expanded, so only the nodes that were opened are ever repr'd
+    """
+
+    def __init__(self, value: Any, name: str | None = None, id: str | None = None, classes: str | None = None):
+        super().__init__(
+            self.node_label(LAST_VALUE, value), data=InspectedValue(value), name=name, id=id, classes=classes
+        )
+        self.root.allow_expand = child_count(value) is not None
+        if self.root.allow_expand:
+            self.load_children(self.root)
+            self.root.expand()
+
+    @staticmethod
+    def node_label(key: str, value: Any, size: Optional[str] = None) -> Text:
+        count = child_count(value)
+        type_name = type(value).__name__ if count is None else f"{type(value).__name__}[{count:,}]"
+        label = Text.assemble((key, "bold"), ": " if key else "", (type_name, "cyan"), " ", short_repr.repr(value))
+        label.append(f"  {size or format_bytes(sys.getsizeof(value))}", style="dim")
+        return label
+
+    def load_children(self, node) -> None:
+        inspected = node.data
+        if inspected is None:
+            return
+        end = inspected.offset + INSPECTOR_PAGE_SIZE
+        for key, child in itertools.islice(iter_children(inspected.value), inspected.offset, end):
+            node.add(
+                self.node_label(key, child), data=InspectedValue(child), allow_expand=child_count(child) is not None
+            )
+        remaining = (child_count(inspected.value) or 0) - end
+        inspected.offset = end
+        if remaining > 0:
+            node.add_leaf(Text(f"... {remaining:,} more, select to load", style="italic"), data=None)
+
+    @on(Tree.NodeExpanded)
+    def _on_node_expanded(self, event: Tree.NodeExpanded[InspectedValue]) -> None:
+        if event.node.data is not None and event.node.data.offset == 0:
+            self.load_children(event.node)
+
+    @on(Tree.NodeSelected)
+    def load_more(self, event: Tree.NodeSelected[InspectedValue]) -> None:
+        if event.node.data is None and event.node.parent is not None:
+            parent = event.node.parent
+            event.node.remove()
+            self.load_children(parent)
+
+
+class InspectorScreen(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+        Binding("d", "deep_size", "Deep size"),
+    ]
+
+    DEFAULT_CSS = """
+    InspectorScreen {
+        align: center middle;
+    }
+
+    InspectorScreen > Vertical {
+        width: 90%;
+        height: 90%;
+        border: thick $primary 50%;
+        background: $surface;
+    }
+
+    InspectorScreen Label {
+        padding: 0 1;
+        color: $text-muted;
+    }
+"""
+
+    def __init__(
+        self,
+        value: Any,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.value = value
+        super().__init__(name, id, classes)
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield ObjectInspector(self.value)
+            yield Label("Enter expands a node, d estimates the deep size of the highlighted node.")
+
+    def on_mount(self) -> None:
+        self.query_one(ObjectInspector).focus()
+
+    def action_deep_size(self) -> None:
+        tree = self.query_one(ObjectInspector)
+        node = tree.cursor_node
+        if node is None or node.data is None:
+            return
+        self._deep_size(node)
+
+    @work(thread=True)
+    def _deep_size(self, node) -> None:
+        size, exact = deep_size(node.data.value)
+        estimate = format_bytes(size) if exact else f"~{format_bytes(size)} (estimated)"
+        self.app.call_from_thread(self._show_deep_size, node, estimate)
+
+    def _show_deep_size(self, node, estimate: str) -> None:
+        label = node.label.copy()
+        label.append(f"  deep {estimate}", style="yellow")
+        node.set_label(label)
+
+
 class InteractiveShellScreen(Screen):
+    # Focusing in compose() doesn't stick when this is the app's default screen
+    AUTO_FOCUS = "#input"
+
     def __init__(
         self,
         name: str | None = None,
         id: str | None = None,
         classes: str | None = None,
+        attach: str | None = None,
+        sandbox: bool = False,
     ):
         super().__init__(name, id, classes)
+        self.attach = attach
+        self.sandbox = sandbox
+        # Set while a run is in flight in the sandbox, which runs one at a time
+        self.sandbox_running = False
+        self.executor = LocalExecutor()
         self.input_tarea = ExtendedTextArea("", id="input", language="python", theme="vscode_dark")
         self.output_tarea = TextArea(
             "# Output",
@@ -266,13 +685,31 @@ class InteractiveShellScreen(Screen):
             theme="vscode_dark",
             classes="text-area",
         )
+        self.database_alias = None
+        self.rollback = False
+        self.trace_allocations = False
+        self.last_metrics = None
+        self.output_unchanged = None
 
     BINDINGS = [
         Binding(key="ctrl+r", action="run_code", description="Run the query"),
+        Binding(key="ctrl+b", action="run_code(True)", description="Run with profiler"),
         Binding(key="ctrl+z", action="copy_command", description="Copy to Clipboard"),
         Binding(key="f1", action="editor_keys", description="Key Bindings"),
         Binding(key="f2", action="default_imports", description="Default imports"),
-        Binding(key="ctrl+j", action="select_mode('commands')", description="Commands"),
+        Binding(key="f3", action="toggle_cache", description="Cache"),
+        Binding(key="f4", action="cycle_database", description="Database"),
+        Binding(key="f5", action="toggle_rollback", description="Rollback"),
+        Binding(key="ctrl+t", action="timeit", description="Timeit"),
+        Binding(key="ctrl+l", action="fan_out", description="Fan-out"),
+        Binding(key="ctrl+g", action="diff_output", description="Diff"),
+        Binding(key="ctrl+o", action="attach", description="Attach"),
+        Binding(key="ctrl+n", action="inspect", description="Inspect"),
+        Binding(key="ctrl+s", action="export", description="Export"),
+        Binding(key="f8", action="run_metrics", description="Run stats"),
+        Binding(key="f9", action="toggle_trace_allocations", description="Trace allocations", show=False),
+        Binding(key="f11", action="toggle_sandbox", description="Sandbox"),
+        Binding(key="ctrl+j", action="select_mode('schema')", description="Schema"),
         Binding(key="ctrl+underscore", action="toggle_comment", description="Toggle Comment", show=False),
     ]
 
@@ -283,75 +720,314 @@ class InteractiveShellScreen(Screen):
             self.input_tarea,
             self.output_tarea,
         )
-        yield Label(f"Python: {platform.python_version()}  Django: {django.__version__}")
+        yield Label(self._status_text(), id="status")
         yield Footer()
 
+    def _status_text(self, result=None) -> str:
+        parts = [f"Python: {platform.python_version()}  Django: {django.__version__}"]
+        if isinstance(self.executor, SandboxExecutor):
+            parts.append(f"Isolated: {self.executor.description}")
+        elif not isinstance(self.executor, LocalExecutor):
+            parts.append(f"Attached: {self.executor.description}")
+        database = f"DB: {self.database_alias or 'routed'}"
+        if self.rollback:
+            database += " (rollback)"
+        parts.append(database)
+        if get_result_cache().enabled:
+            parts.append(f"Cache: on ({len(get_result_cache())} entries)")
+        if result:
+            parts.append(result["metrics"].summary())
+        if result and self.output_unchanged is not None:
+            parts.append("Output unchanged" if self.output_unchanged else "Output changed")
+        if self.trace_allocations:
+            parts.append("Tracing allocations")
+        if result and result["cached"]:
+            lines = ", ".join(str(line) for line in result["cached"])
+            parts.append(f"Served from cache: line(s) {lines}")
+        return "  |  ".join(parts)
+
+    def _update_status(self, result=None) -> None:
+        self.query_one("#status", Label).update(self._status_text(result))
+
+    def action_toggle_cache(self) -> None:
+        cache = get_result_cache()
+        cache.enabled = not cache.enabled
+        if not cache.enabled:
+            cache.clear()
+        self.notify(f"Result cache {'enabled' if cache.enabled else 'disabled'}.")
+        self._update_status()
+
+    def action_cycle_database(self) -> None:
+        # None keeps the routing configured in settings
+        aliases = [None, *get_aliases()]
+        self.database_alias = aliases[(aliases.index(self.database_alias) + 1) % len(aliases)]
+        self.notify(f"Running queries on {self.database_alias or 'the database chosen by routers'}.")
+        self._update_status()
+
+    def action_toggle_rollback(self) -> None:
+        self.rollback = not self.rollback
+        self.notify("Transactions will be rolled back." if self.rollback else "Transactions will be committed.")
+        self._update_status()
+
+    def action_toggle_trace_allocations(self) -> None:
+        self.trace_allocations = not self.trace_allocations
+        self.notify(f"Allocation tracing {'enabled' if self.trace_allocations else 'disabled'}.")
+        self._update_status()
+
+    def action_run_metrics(self) -> None:
+        if self.last_metrics is None:
+            self.notify("Run some code first.", severity="warning")
+            return
+        self.app.push_screen(RunMetricsInfo(self.last_metrics))
+
     def action_default_imports(self) -> None:
         self.app.push_screen(DefaultImportsInfo(import_str()))
 
-    def action_run_code(self) -> None:
+    def _code_to_cursor(self) -> str:
         # get Code from start till the position of the cursor
         self.input_tarea.selection = Selection(start=(0, 0), end=self.input_tarea.cursor_location)
         self.input_tarea.action_cursor_line_end()
-        code = self.input_tarea.get_text_range(start=(0, 0), end=self.input_tarea.cursor_location)
+        return self.input_tarea.get_text_range(start=(0, 0), end=self.input_tarea.cursor_location)
+
+    def action_run_code(self, profile: bool = False) -> None:
+        code = self._code_to_cursor()
 
         if len(code) > 0:
             # Because the cli - texualize is running on a loop - has an event loop
+            # Only needed for sync ORM calls, coroutines run on the shell's own loop
             # os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rest.settings')
             os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"
             django.setup()
 
-            result = run_code(code)
-            self.output_tarea.load_text(result["out"])
+            if isinstance(self.executor, SandboxExecutor):
+                if self.sandbox_running:
+                    self.notify("The sandbox is still running the previous code.", severity="warning")
+                    return
+                if profile:
+                    self.notify("The profiler only runs in this process, running without it.", severity="warning")
+                self.sandbox_running = True
+                self.output_tarea.load_text("")
+                self._run_sandboxed(code)
+                return
 
-    def action_copy_command(self) -> None:
-        if sys.platform == "win32":
-            copy_command = ["clip"]
-        elif sys.platform == "darwin":
-            copy_command = ["pbcopy"]
+            profiler = None
+            if profile:
+                if isinstance(self.executor, LocalExecutor):
+                    profiler = make_profiler()
+                else:
+                    self.notify("The profiler only runs in this process, running without it.", severity="warning")
+            try:
+                result = self.executor.run(
+                    code,
+                    cache=get_result_cache().enabled,
+                    alias=self.database_alias,
+                    rollback=self.rollback,
+                    trace_allocations=self.trace_allocations,
+                    profiler=profiler,
+                )
+            except (OSError, RuntimeError) as e:
+                self._lost_executor(e)
+                return
+            self._show_result(code, result)
+            if profiler is not None:
+                profile = profiler.result()
+                if profile.root.value:
+                    self.app.push_screen(ProfileScreen(profile))
+                else:
+                    self.notify("The profiler took no samples, the snippet finished too quickly.", severity="warning")
+
+    def _show_result(self, code: str, result) -> None:
+        self.last_metrics = result["metrics"]
+        history = get_output_history()
+        previous = history.get(0)
+        self.output_unchanged = None if previous is None else previous.out == result["out"]
+        history.append(code, result["out"])
+        self.output_tarea.load_text(result["out"])
+        self._update_status(result)
+
+    def _lost_executor(self, error: Exception) -> None:
+        self.notify(f"Lost the connection to {self.executor.description}: {error}", severity="error")
+        self._detach_agent()
+
+    @work(thread=True, group="sandbox")
+    def _run_sandboxed(self, code: str) -> None:
+        # Off the UI thread, so output shows up while the sandbox prints it
+        try:
+            result = self.executor.run(
+                code,
+                cache=get_result_cache().enabled,
+                alias=self.database_alias,
+                rollback=self.rollback,
+                trace_allocations=self.trace_allocations,
+                output=lambda text: self.app.call_from_thread(self._append_output, text),
+            )
+        except SandboxKilledError as e:
+            self.app.call_from_thread(self._sandbox_killed, str(e))
+        except RuntimeError as e:
+            # The sandbox answered with an error, e.g. it ran out of memory outside of the code
+            self.app.call_from_thread(self.notify, f"The sandbox failed to run the code: {e}", severity="error")
+        except OSError as e:
+            self.app.call_from_thread(self._lost_executor, e)
+        else:
+            self.app.call_from_thread(self._show_result, code, result)
+        finally:
+            self.sandbox_running = False
+
+    def _append_output(self, text: str) -> None:
+        self.output_tarea.insert(text, self.output_tarea.document.end)
+
+    def _sandbox_killed(self, message: str) -> None:
+        # Keep what was printed before the process died
+        self._append_output(f"\n# {message}\n")
+        self.notify(message, severity="error")
+        self._update_status()
+
+    def _runs_locally(self, action: str) -> bool:
+        """
+        Whether code runs in this process, warn that action isn't available otherwise
+        """
+        if isinstance(self.executor, LocalExecutor):
+            return True
+        self.notify(
+            f"{action} can only run code in this process, leave the sandbox with F11 or detach with Ctrl+O first.",
+            severity="warning",
+        )
+        return False
+
+    def action_timeit(self) -> None:
+        if not self._runs_locally("Timeit"):
+            return
+        # Time the selection if there is one, everything up to the cursor otherwise
+        code = self.input_tarea.selected_text or self._code_to_cursor()
+        if len(code) > 0:
+            try:
+                # A copy, the timed code runs on a worker thread and mustn't change the shell's variables
+                screen = TimeitScreen(
+                    code, globals(), lambda: dict(get_scope()), alias=self.database_alias, rollback=self.rollback
+                )
+            except SyntaxError as e:
+                self.notify(f"Can't time the code: {e}", severity="error")
+                return
+            self.app.push_screen(screen)
+
+    def action_fan_out(self) -> None:
+        if not self._runs_locally("Fan-out"):
+            return
+        code = self._code_to_cursor()
+        if len(code) > 0:
+            self.app.push_screen(FanOutScreen(code, globals(), lambda: dict(get_scope()), rollback=self.rollback))
+
+    def on_mount(self) -> None:
+        # Runs on worker threads capture their output through it
+        install_stdout()
+        if self.attach is not None:
+            self._attach_agent(self.attach)
+        elif self.sandbox:
+            self.action_toggle_sandbox()
+
+    def on_unmount(self) -> None:
+        self.executor.close()
+
+    def action_attach(self) -> None:
+        if self.sandbox_running:
+            self.notify("The sandbox is still running code.", severity="warning")
+        elif isinstance(self.executor, LocalExecutor):
+            self.app.push_screen(AttachScreen(), self._attach_agent)
         else:
-            copy_command = ["xclip", "-selection", "clipboard"]
+            self.notify(f"Detached from {self.executor.description}.")
+            self._detach_agent()
 
+    def _attach_agent(self, path: str | None) -> None:
+        if path is None:
+            return
         try:
-            # If nothing is selected copy all text in focused area
-            if not self.input_tarea.selected_text and not self.output_tarea.selected_text:
-                if self.input_tarea.text and self.input_tarea.has_focus:
-                    text_to_copy = self.input_tarea.text
-                    msg = "Input copied to clipboard."
-                elif self.output_tarea.text and self.output_tarea.has_focus:
-                    text_to_copy = self.output_tarea.text
-                    msg = "Output copied to clipboard."
-                else:
-                    self.notify("Nothing to copy to clipboard.", severity="warning")
-                    return
+            executor = RemoteExecutor(path)
+        except (OSError, RuntimeError) as e:
+            self.notify(f"Could not attach to {path}: {e}", severity="error")
+            return
+        self.executor.close()
+        self.executor = executor
+        self.notify(f"Attached to {executor.description}, code now runs in that process.")
+        self._update_status()
 
-            # If both areas have selected text copy the selected text in focused area
-            elif self.input_tarea.selected_text and self.output_tarea.selected_text:
-                if self.input_tarea.has_focus:
-                    text_to_copy = self.input_tarea.selected_text
-                    msg = "Input selection copied to clipboard."
-                else:
-                    text_to_copy = self.output_tarea.selected_text
-                    msg = "Output selection copied to clipboard."
-            elif self.input_tarea.selected_text:
+    def action_toggle_sandbox(self) -> None:
+        if self.sandbox_running:
+            self.notify("The sandbox is still running code.", severity="warning")
+            return
+        if isinstance(self.executor, SandboxExecutor):
+            self.notify("Left the sandbox, code runs in this process again.")
+            self._detach_agent()
+            return
+        try:
+            executor = SandboxExecutor()
+        except (OSError, RuntimeError) as e:
+            self.notify(f"Could not start the sandbox: {e}", severity="error")
+            return
+        self.executor.close()
+        self.executor = executor
+        self.notify(f"Code now runs in a {executor.description}.")
+        self._update_status()
+
+    def _detach_agent(self) -> None:
+        self.executor.close()
+        self.executor = LocalExecutor()
+        self._update_status()
+
+    def action_inspect(self) -> None:
+        if not isinstance(self.executor, LocalExecutor):
+            self.notify("Values of another process can't be inspected, print them instead.", severity="warning")
+            return
+        if not get_last_value().is_bound(get_scope()):
+            self.notify("End a snippet with an expression to inspect its value.", severity="warning")
+            return
+        self.app.push_screen(InspectorScreen(get_scope()[LAST_VALUE]))
+
+    def action_export(self) -> None:
+        local = isinstance(self.executor, LocalExecutor) and get_last_value().is_bound(get_scope())
+        value = get_scope()[LAST_VALUE] if local else None
+        if not isinstance(value, QuerySet):
+            self.notify("End a snippet with a queryset to export its rows.", severity="warning")
+            return
+        self.app.push_screen(ExportScreen(value, alias=self.database_alias))
+
+    def action_diff_output(self) -> None:
+        if len(get_output_history()) < 2:
+            self.notify("Run some code twice to compare outputs.", severity="warning")
+            return
+        self.app.push_screen(DiffScreen(get_output_history()))
+
+    def action_copy_command(self) -> None:
+        # If nothing is selected copy all text in focused area
+        if not self.input_tarea.selected_text and not self.output_tarea.selected_text:
+            if self.input_tarea.text and self.input_tarea.has_focus:
+                text_to_copy = self.input_tarea.text
+                msg = "Input copied to clipboard."
+            elif self.output_tarea.text and self.output_tarea.has_focus:
+                text_to_copy = self.output_tarea.text
+                msg = "Output copied to clipboard."
+            else:
+                self.notify("Nothing to copy to clipboard.", severity="warning")
+                return
+
+        # If both areas have selected text copy the selected text in focused area
+        elif self.input_tarea.selected_text and self.output_tarea.selected_text:
+            if self.input_tarea.has_focus:
                 text_to_copy = self.input_tarea.selected_text
                 msg = "Input selection copied to clipboard."
-            elif self.output_tarea.selected_text:
+            else:
                 text_to_copy = self.output_tarea.selected_text
                 msg = "Output selection copied to clipboard."
-            else:
-                self.notify("Nothing to copy to clipboard.", severity="warning")
-                return
+        elif self.input_tarea.selected_text:
+            text_to_copy = self.input_tarea.selected_text
+            msg = "Input selection copied to clipboard."
+        elif self.output_tarea.selected_text:
+            text_to_copy = self.output_tarea.selected_text
+            msg = "Output selection copied to clipboard."
+        else:
+            self.notify("Nothing to copy to clipboard.", severity="warning")
+            return
 
-            run(
-                copy_command,
-                input=text_to_copy,
-                text=True,
-                check=False,
-            )
-            self.notify(msg)
-        except FileNotFoundError:
-            self.notify(f"Could not copy to clipboard. `{copy_command[0]}` not found.", severity="error")
+        get_clipboard(self.app).copy(text_to_copy, msg)
 
     def _get_selected_lines(self) -> Tuple[List[str], Location, Location]:
         [first, last] = sorted([self.input_tarea.selection.start, self.input_tarea.selection.end])
@@ -391,7 +1067,7 @@ class InteractiveShellScreen(Screen):
     def action_editor_keys(self) -> None:
         self.app.push_screen(TextEditorBindingsInfo())
 
-    def action_select_mode(self, mode_id: Literal["commands", "shell"]) -> None:
+    def action_select_mode(self, mode_id: Literal["commands", "shell", "schema"]) -> None:
         if mode_id == "commands":
             from django_tui.management.commands.tui import DjangoCommandBuilder
 
@@ -399,3 +1075,6 @@ class InteractiveShellScreen(Screen):
 
         elif mode_id == "shell":
             self.app.push_screen(InteractiveShellScreen("Interactive Shell"))
+
+        elif mode_id == "schema":
+            self.app.push_screen(SchemaBrowserScreen("Schema"))
@@ -1,17 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import importlib
 import os
 import shlex
+import sys
 from pathlib import Path
 from typing import Any, Literal
 from webbrowser import open as open_url
 
 import click
-from django.core.management import BaseCommand, get_commands, load_command_class
+from django.core.management import BaseCommand, CommandError, get_commands, load_command_class
 from rich.console import Console
 from rich.highlighter import ReprHighlighter
 from rich.text import Text
-from textual import on
+from textual import events, on
 from textual.app import App, AutopilotCallbackType, ComposeResult
 from textual.binding import Binding
 from textual.containers import Horizontal, Vertical, VerticalScroll
@@ -38,112 +41,138 @@ from trogon.widgets.command_tree import CommandTree
 from trogon.widgets.form import CommandForm
 from trogon.widgets.multiple_choice import NonFocusableVerticalScroll
 
+from django_tui.autopilot import Recorder, Script
+from django_tui.autopilot import replay as replay_script
+from django_tui.clipboard import get_clipboard
 from django_tui.management.commands.ish import InteractiveShellScreen
+from django_tui.migrations import MigrationsScreen
+from django_tui.presets import PresetsScreen, fill_form, get_preset_store, invocation_from_command_data
+from django_tui.schema import SchemaBrowserScreen
+from django_tui.watch import FileWatcher, build_index
 
 
-def introspect_django_commands() -> dict[str, CommandSchema]:
-    groups = {}
-    for name, app_name in get_commands().items():
-        try:
-            kls = load_command_class(app_name, name)
-        except AttributeError:
-            # Skip invalid commands
-            continue
-        if app_name == "django.core":
-            group_name = "django"
+def command_group_name(app_name: str) -> str:
+    if app_name == "django.core":
+        return "django"
+    return app_name.rpartition(".")[-1]
+
+
+def introspect_django_command(name: str, app_name: str, groups: dict[str, CommandSchema]) -> CommandSchema | None:
+    """
+    Introspect a single command and add it to its group, creating the group if needed.
+    Return None for invalid commands.
+    """
+    try:
+        kls = load_command_class(app_name, name)
+    except AttributeError:
+        # Skip invalid commands
+        return None
+    group_name = command_group_name(app_name)
+
+    parser = kls.create_parser(f"django {name}", name)
+    options = []
+    args = []
+    root = []
+    for action in parser._actions:
+        if action.nargs == "?":
+            nargs = 1
+        elif action.nargs in ("*", "+"):
+            nargs = -1
+        elif not action.nargs:
+            nargs = 1
         else:
-            group_name = app_name.rpartition(".")[-1]
-
-        parser = kls.create_parser(f"django {name}", name)
-        options = []
-        args = []
-        root = []
-        for action in parser._actions:
-            if action.nargs == "?":
-                nargs = 1
-            elif action.nargs in ("*", "+"):
-                nargs = -1
-            elif not action.nargs:
-                nargs = 1
-            else:
-                nargs = action.nargs
-
-            if hasattr(action, "type"):
-                if action.type is bool:
-                    type_ = click.BOOL
-                elif action.type is int:
-                    type_ = click.INT
-                elif action.type is str:
-                    type_ = click.STRING
-                else:
-                    type_ = click.STRING if action.nargs != 0 else click.BOOL
+            nargs = action.nargs
+
+        if hasattr(action, "type"):
+            if action.type is bool:
+                type_ = click.BOOL
+            elif action.type is int:
+                type_ = click.INT
+            elif action.type is str:
+                type_ = click.STRING
             else:
                 type_ = click.STRING if action.nargs != 0 else click.BOOL
+        else:
+            type_ = click.STRING if action.nargs != 0 else click.BOOL
 
-            default = action.default
-            if default is None:
-                default = MultiValueParamData([])
-            elif type_ is click.BOOL:
-                default = MultiValueParamData([])
-            else:
-                default = MultiValueParamData(values=[(default,)])
-
-            if not action.option_strings:
-                args.append(
-                    ArgumentSchema(
-                        name=action.metavar or action.dest,
-                        type=type_,
-                        required=action.required if action.nargs != "*" else False,
-                        default=default,
-                        choices=action.choices,
-                        multiple=action.nargs in ("+", "*"),
-                        nargs=nargs,
-                    )
+        default = action.default
+        if default is None:
+            default = MultiValueParamData([])
+        elif type_ is click.BOOL:
+            default = MultiValueParamData([])
+        else:
+            default = MultiValueParamData(values=[(default,)])
+
+        if not action.option_strings:
+            args.append(
+                ArgumentSchema(
+                    name=action.metavar or action.dest,
+                    type=type_,
+                    required=action.required if action.nargs != "*" else False,
+                    default=default,
+                    choices=action.choices,
+                    multiple=action.nargs in ("+", "*"),
+                    nargs=nargs,
                 )
-                continue
-            option_name = action.option_strings[0]
-
-            schema = OptionSchema(
-                name=option_name,
-                type=type_,
-                help=action.help,
-                default=default,
-                required=action.required,
-                multiple=action.nargs in ("+", "*"),
-                choices=action.choices,
-                is_flag=action.nargs == 0,
-                is_boolean_flag=action.nargs == 0,
-                nargs=nargs,
             )
-            if option_name in (
-                "-h",
-                "--version",
-                "-v",
-                "--settings",
-                "--pythonpath",
-                "--traceback",
-                "--no-color",
-                "--force-color",
-                "--skip-checks",
-            ):
-                root.append(schema)
-            else:
-                options.append(schema)
-
-        if group_name not in groups:
-            groups[group_name] = CommandSchema(name=group_name, function=None, is_group=True, options=root)
-
-        command = CommandSchema(
-            name=name,
-            function=None,
-            is_group=False,
-            docstring=None,
-            options=options,
-            arguments=args,
-            parent=groups[group_name],
+            continue
+        option_name = action.option_strings[0]
+
+        schema = OptionSchema(
+            name=option_name,
+            type=type_,
+            help=action.help,
+            default=default,
+            required=action.required,
+            multiple=action.nargs in ("+", "*"),
+            choices=action.choices,
+            is_flag=action.nargs == 0,
+            is_boolean_flag=action.nargs == 0,
+            nargs=nargs,
         )
+        if option_name in (
+            "-h",
+            "--version",
+            "-v",
+            "--settings",
+            "--pythonpath",
+            "--traceback",
+            "--no-color",
+            "--force-color",
+            "--skip-checks",
+        ):
+            root.append(schema)
+        else:
+            options.append(schema)
+
+    if group_name not in groups:
+        groups[group_name] = CommandSchema(name=group_name, function=None, is_group=True, options=root)
+
+    command = CommandSchema(
+        name=name,
+        function=None,
+        is_group=False,
+        docstring=None,
+        options=options,
+        arguments=args,
+        parent=groups[group_name],
+    )
+
+    groups[group_name].subcommands[name] = command
+    return command
+
 
-        groups[group_name].subcommands[name] = command
+def exec_command(app_name: str, args: list[str]) -> None:
+    """Replace the current process with the given manage.py command."""
+    Console().print(f"Running [b cyan]{app_name} {' '.join(shlex.quote(s) for s in args)}[/]")
+    split_app_name = shlex.split(app_name)
+    os.execvp(split_app_name[0], [*split_app_name, *args])
+
+
+def introspect_django_commands() -> dict[str, CommandSchema]:
+    groups = {}
+    for name, app_name in get_commands().items():
+        introspect_django_command(name, app_name, groups)
 
     return groups
 
@@ -172,6 +201,7 @@ class DjangoCommandBuilder(Screen):
     COMPONENT_CLASSES = {"version-string", "prompt", "command-name-syntax"}
     BINDINGS = [
         Binding(key="ctrl+r", action="close_and_run", description="Close & Run"),
+        Binding(key="f3", action="presets", description="Presets"),
     ]
 
     def __init__(
@@ -249,8 +279,32 @@ class DjangoCommandBuilder(Screen):
         yield Footer()
 
     def action_close_and_run(self) -> None:
+        message = None
+        if self.command_data is not None:
+            try:
+                get_preset_store().record(invocation_from_command_data(self.command_data))
+            except OSError as e:
+                # The command still runs, the message is printed once the TUI has closed
+                message = f"Could not save the invocation to the presets file: {e}"
         self.app.execute_on_exit = True
-        self.app.exit()
+        self.app.exit(message=message)
+
+    def action_presets(self) -> None:
+        command = getattr(self, "selected_command_schema", None)
+        if command is None or command.is_group:
+            self.notify("Select a command first.", severity="warning")
+            return
+        current = None
+        if self.command_data is not None:
+            current = invocation_from_command_data(self.command_data)
+            if current.command != command.name:
+                current = None
+        self.app.push_screen(PresetsScreen(command.name, current), self._load_invocation)
+
+    async def _load_invocation(self, invocation) -> None:
+        if invocation is None:
+            return
+        await fill_form(self.query_one(CommandForm), invocation.values)
 
     async def _refresh_command_form(self, node: TreeNode[CommandSchema] | None = None) -> None:
         selected_command = node.data
@@ -293,6 +347,32 @@ class DjangoCommandBuilder(Screen):
             preview_string = Text.assemble(("$ ", prompt_style), highlighted_new_value)
             self.query_one("#home-exec-preview-static", Static).update(preview_string)
 
+    async def reload_command(self, name: str, app_name: str, removed: bool = False) -> None:
+        """Replace the schema of a command in the tree, adding or removing the command if needed."""
+        group = self.command_schemas.get(command_group_name(app_name))
+        if group is not None:
+            group.subcommands.pop(name, None)
+        command = None if removed else introspect_django_command(name, app_name, self.command_schemas)
+
+        tree = self.query_one(CommandTree)
+        group_name = command_group_name(app_name)
+        group_node = next((node for node in tree.root.children if node.data.name == group_name), None)
+        if group_node is None:
+            if command is None:
+                return
+            group_node = tree.root.add(group_name, data=self.command_schemas[group_name], expand=True)
+
+        node = next((node for node in group_node.children if node.data.name == name), None)
+        if command is None:
+            if node is not None:
+                node.remove()
+        elif node is None:
+            group_node.add_leaf(name, data=command)
+        else:
+            node.data = command
+            if tree.cursor_node is node:
+                await self._refresh_command_form(node)
+
     async def _update_form_body(self, node: TreeNode[CommandSchema]) -> None:
         # self.query_one(Pretty).update(node.data)
         parent = self.query_one("#home-body-scroll", VerticalScroll)
@@ -317,12 +397,17 @@ class DjangoTui(App):
         Binding(key="ctrl+s", action="focus('search')", description="Search"),
         Binding(key="ctrl+j", action="select_mode('shell')", description="Shell"),
         Binding(key="f1", action="about", description="About"),
+        Binding(key="f2", action="migrations", description="Migrations"),
     ]
 
     def __init__(
         self,
         *,
         open_shell: bool = False,
+        watch: bool = False,
+        attach: str | None = None,
+        record: str | None = None,
+        sandbox: bool = False,
     ) -> None:
         super().__init__()
         self.post_run_command: list[str] = []
@@ -331,13 +416,78 @@ class DjangoTui(App):
         self.app_name = "python manage.py"
         self.command_name = "django-tui"
         self.open_shell = open_shell
+        self.watch = watch
+        self.attach = attach
+        self.record = record
+        self.sandbox = sandbox
+        self.recorder = None
+        self.watcher = None
 
     def get_default_screen(self) -> DjangoCommandBuilder:
         if self.open_shell:
-            return InteractiveShellScreen("Interactive Shell")
+            return InteractiveShellScreen("Interactive Shell", attach=self.attach, sandbox=self.sandbox)
         else:
             return DjangoCommandBuilder(self.app_name, self.command_name)
 
+    def on_mount(self) -> None:
+        if self.record is not None:
+            self.recorder = Recorder(size=(self.size.width, self.size.height), open_shell=self.open_shell)
+        if self.watch:
+            self.watcher = FileWatcher(build_index(), self._files_changed)
+            self.watcher.start()
+
+    def on_unmount(self) -> None:
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.recorder is not None:
+            self.recorder.script.save(self.record)
+
+    async def on_event(self, event: events.Event) -> None:
+        if self.recorder is not None and isinstance(event, events.Key) and not event.is_forwarded:
+            self.recorder.record(event)
+        await super().on_event(event)
+
+    def _files_changed(self, paths: set[str]) -> None:
+        # Called from the watcher thread
+        try:
+            self.call_from_thread(self.reload_changed, paths)
+        except RuntimeError:
+            # The app is shutting down
+            pass
+
+    async def reload_changed(self, paths: set[str]) -> None:
+        """Hot reload changed command modules, report changed model modules as those need a restart."""
+        index = self.watcher.index
+        for path in sorted(paths):
+            directory, filename = os.path.split(path)
+            if directory in index.command_dirs and not filename.startswith("_"):
+                await self._reload_command(path, filename[:-3], index.command_dirs[directory])
+            elif path in index.model_modules:
+                self.notify(
+                    f"`{index.model_modules[path]}` defines models, restart to pick up changes to models.",
+                    severity="warning",
+                )
+
+    async def _reload_command(self, path: str, name: str, app_name: str) -> None:
+        module_name = f"{app_name}.management.commands.{name}"
+        removed = not os.path.exists(path)
+        get_commands.cache_clear()
+        try:
+            if removed:
+                sys.modules.pop(module_name, None)
+                self.watcher.index.commands.pop(path, None)
+            else:
+                if module_name in sys.modules:
+                    importlib.reload(sys.modules[module_name])
+                self.watcher.index.commands[path] = (name, app_name)
+            for screen in self.screen_stack:
+                if isinstance(screen, DjangoCommandBuilder):
+                    await screen.reload_command(name, app_name, removed=removed)
+        except Exception as e:
+            self.notify(f"Could not reload command `{name}`: {e}", severity="error")
+        else:
+            self.notify(f"Command `{name}` {'removed' if removed else 'reloaded'}.")
+
     @on(Button.Pressed, "#home-exec-button")
     def on_button_pressed(self):
         self.execute_on_exit = True
@@ -353,17 +503,8 @@ class DjangoTui(App):
         try:
             super().run(headless=headless, size=size, auto_pilot=auto_pilot)
         finally:
-            if self.post_run_command:
-                console = Console()
-                if self.post_run_command and self.execute_on_exit:
-                    console.print(
-                        f"Running [b cyan]{self.app_name} {' '.join(shlex.quote(s) for s in self.post_run_command)}[/]"
-                    )
-
-                    split_app_name = shlex.split(self.app_name)
-                    program_name = shlex.split(self.app_name)[0]
-                    arguments = [*split_app_name, *self.post_run_command]
-                    os.execvp(program_name, arguments)
+            if self.post_run_command and self.execute_on_exit:
+                exec_command(self.app_name, self.post_run_command)
 
     @on(CommandForm.Changed)
     def update_command_to_run(self, event: CommandForm.Changed):
@@ -390,28 +531,76 @@ class DjangoTui(App):
         """
         open_url(url)
 
-    def action_select_mode(self, mode_id: Literal["commands", "shell"]) -> None:
+    def action_select_mode(self, mode_id: Literal["commands", "shell", "schema"]) -> None:
         if mode_id == "commands":
             self.app.push_screen(DjangoCommandBuilder("pyhton manage.py", "Test command name"))
 
         elif mode_id == "shell":
             self.app.push_screen(InteractiveShellScreen("Interactive Shell"))
 
+        elif mode_id == "schema":
+            self.app.push_screen(SchemaBrowserScreen("Schema"))
+
     def action_copy_command(self) -> None:
         command = self.app_name + " " + " ".join(shlex.quote(str(x)) for x in self.post_run_command)
-        self.copy_to_clipboard(command)
-        self.notify(f"`{command}` copied to clipboard.")
+        get_clipboard(self).copy(command, f"`{command}` copied to clipboard.")
 
     def action_about(self) -> None:
         self.app.push_screen(AboutDialog())
 
+    def action_migrations(self) -> None:
+        self.app.push_screen(MigrationsScreen())
+
 
 class Command(BaseCommand):
     help = """Run and inspect Django commands in a text-based user interface (TUI)."""
 
     def add_arguments(self, parser):
         parser.add_argument("--shell", action="store_true", help="Open django shell")
+        parser.add_argument(
+            "--watch", action="store_true", help="Reload changed commands without restarting, report changed models"
+        )
+        parser.add_argument("--preset", metavar="NAME", help="Run a saved command preset without opening the TUI")
+        parser.add_argument(
+            "--attach", metavar="SOCKET", help="Open the shell attached to a `tui_agent` listening on SOCKET"
+        )
+        parser.add_argument(
+            "--sandbox", action="store_true", help="Open the shell running code in a child process with resource limits"
+        )
+        parser.add_argument("--record", metavar="PATH", help="Record the pressed keys into a replayable script")
+        parser.add_argument(
+            "--replay", metavar="PATH", help="Replay a recorded script headless and report the latency of every step"
+        )
 
-    def handle(self, *args: Any, shell=False, **options: Any) -> None:
-        app = DjangoTui(open_shell=shell)
+    def handle(
+        self,
+        *args: Any,
+        shell=False,
+        watch=False,
+        preset=None,
+        attach=None,
+        sandbox=False,
+        record=None,
+        replay=None,
+        **options: Any,
+    ) -> None:
+        if preset is not None:
+            invocation = get_preset_store().presets.get(preset)
+            if invocation is None:
+                msg = f"Unknown preset {preset!r}, save one with F3 in the command builder."
+                raise CommandError(msg)
+            exec_command("python manage.py", invocation.args)
+            return
+        if replay is not None:
+            script = Script.load(replay)
+            report = asyncio.run(replay_script(DjangoTui(open_shell=script.shell), script))
+            self.stdout.write(report.summary())
+            return
+        app = DjangoTui(
+            open_shell=shell or attach is not None or sandbox,
+            watch=watch,
+            attach=attach,
+            record=record,
+            sandbox=sandbox,
+        )
         app.run()
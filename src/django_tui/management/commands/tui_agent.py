@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management import BaseCommand, CommandError
+
+from django_tui.remote import AgentServer, default_socket_path
+
+
+class Command(BaseCommand):
+    help = """Serve the django-tui shell on a Unix domain socket, attach to it with `tui --attach`."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=None, help="Socket path, defaults to $DJANGO_TUI_AGENT_SOCKET")
+
+    def handle(self, *args: Any, socket=None, **options: Any) -> None:
+        path = socket or default_socket_path()
+        try:
+            server = AgentServer(path)
+        except (OSError, RuntimeError) as e:
+            msg = f"Could not listen on {path}: {e}"
+            raise CommandError(msg) from e
+        self.stdout.write(f"django-tui agent listening on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import ast
+import datetime as dt
+import decimal
+import hashlib
+import time
+import types
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass, field
+from io import StringIO
+from typing import Any, Dict, Hashable, List, Mapping, MutableMapping, Optional, Tuple, Union
+
+from django.db.models import Model, QuerySet
+from django.db.models.manager import BaseManager
+
+from django_tui.aio import exec_code
+
+# QuerySet methods that return another QuerySet without running a query
+CHAINED_QUERYSET_METHODS = {
+    "all",
+    "annotate",
+    "dates",
+    "datetimes",
+    "defer",
+    "difference",
+    "distinct",
+    "exclude",
+    "filter",
+    "intersection",
+    "none",
+    "only",
+    "order_by",
+    "prefetch_related",
+    "select_related",
+    "union",
+    "using",
+    "values",
+    "values_list",
+}
+
+# QuerySet methods that only read and return a result, iterator() isn't one
+# of them because a cached iterator is exhausted when it is served again
+READING_QUERYSET_METHODS = {
+    "aggregate",
+    "contains",
+    "count",
+    "earliest",
+    "exists",
+    "explain",
+    "first",
+    "get",
+    "in_bulk",
+    "last",
+    "latest",
+}
+READING_QUERYSET_METHODS |= {f"a{name}" for name in READING_QUERYSET_METHODS}
+
+# Statements may call these on querysets of known models, and PURE_FUNCS, and
+# nothing else to be served from the cache
+PURE_QUERYSET_METHODS = CHAINED_QUERYSET_METHODS | READING_QUERYSET_METHODS
+
+PURE_FUNCS = {
+    "Avg",
+    "Count",
+    "F",
+    "Max",
+    "Min",
+    "Q",
+    "Sum",
+    "abs",
+    "all",
+    "any",
+    "bool",
+    "dict",
+    "enumerate",
+    "float",
+    "frozenset",
+    "int",
+    "isinstance",
+    "len",
+    "list",
+    "max",
+    "min",
+    "pprint",
+    "print",
+    "print_json",
+    "range",
+    "repr",
+    "round",
+    "set",
+    "sorted",
+    "str",
+    "sum",
+    "tuple",
+    "type",
+    "zip",
+}
+
+# Values of these types are fingerprinted by value
+VALUE_TYPES = (
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    bool,
+    type(None),
+    dt.date,
+    dt.time,
+    dt.timedelta,
+    decimal.Decimal,
+    uuid.UUID,
+)
+
+# Containers with more items than this are not fingerprinted, statements reading them aren't cached
+MAX_FINGERPRINT_ITEMS = 10_000
+MAX_FINGERPRINT_DEPTH = 10
+
+
+def bound_names(stmt: ast.stmt) -> List[str]:
+    """
+    Return names assigned by a read-only statement
+    """
+    if isinstance(stmt, ast.Assign):
+        targets = stmt.targets
+    elif isinstance(stmt, ast.AnnAssign):
+        targets = [stmt.target]
+    else:
+        return []
+
+    names = []
+    for target in targets:
+        for node in ast.walk(target):
+            if isinstance(node, ast.Name):
+                names.append(node.id)
+    return names
+
+
+def is_queryset(node: ast.expr, namespace: Mapping[str, Any]) -> bool:
+    """
+    Return True if node evaluates to a QuerySet or Manager, i.e. a manager of a
+    model class, a QuerySet or Manager in namespace, or a chain of
+    CHAINED_QUERYSET_METHODS on one of those
+    """
+    if isinstance(node, ast.Name):
+        return isinstance(namespace.get(node.id), (QuerySet, BaseManager))
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        model = namespace.get(node.value.id)
+        return (
+            isinstance(model, type)
+            and issubclass(model, Model)
+            and isinstance(getattr(model, node.attr, None), BaseManager)
+        )
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        return node.func.attr in CHAINED_QUERYSET_METHODS and is_queryset(node.func.value, namespace)
+    return False
+
+
+def is_read_only(stmt: ast.stmt, namespace: Mapping[str, Any]) -> bool:
+    """
+    Return True if the statement looks free of side effects, apart from printing.
+    The check is conservative: only plain expressions and assignments to names
+    qualify, and every call must be a read-only QuerySet method on a queryset of
+    a known model or a pure builtin. Names are resolved in namespace.
+    """
+    if isinstance(stmt, ast.Assign):
+        targets = stmt.targets
+    elif isinstance(stmt, ast.AnnAssign):
+        if stmt.value is None:
+            return False
+        targets = [stmt.target]
+    elif isinstance(stmt, ast.Expr):
+        targets = []
+    else:
+        return False
+
+    for target in targets:
+        for node in ast.walk(target):
+            if not isinstance(node, (ast.Name, ast.Tuple, ast.List, ast.Store)):
+                return False
+
+    for node in ast.walk(stmt.value):
+        if isinstance(node, (ast.NamedExpr, ast.Yield, ast.YieldFrom)):
+            return False
+        if isinstance(node, ast.Call):
+            func = node.func
+            if (
+                isinstance(func, ast.Attribute)
+                and func.attr in PURE_QUERYSET_METHODS
+                and is_queryset(func.value, namespace)
+            ):
+                continue
+            if isinstance(func, ast.Name) and func.id in PURE_FUNCS:
+                continue
+            return False
+    return True
+
+
+def fingerprint(value: Any, depth: int = 0) -> Optional[Hashable]:
+    """
+    Return a hashable summary of the contents of value, None if it can't be
+    summarized, e.g. generators or arbitrary objects
+    """
+    if isinstance(value, VALUE_TYPES):
+        return (type(value).__name__, value)
+    if depth > MAX_FINGERPRINT_DEPTH:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset, dict)):
+        if len(value) > MAX_FINGERPRINT_ITEMS:
+            return None
+        if isinstance(value, dict):
+            items = [fingerprint(item, depth + 1) for pair in value.items() for item in pair]
+        elif isinstance(value, (set, frozenset)):
+            items = sorted((fingerprint(item, depth + 1) for item in value), key=repr)
+        else:
+            items = [fingerprint(item, depth + 1) for item in value]
+        if None in items:
+            return None
+        return (type(value).__name__, tuple(items))
+    if isinstance(value, QuerySet):
+        try:
+            sql = str(value.query)
+        except Exception:
+            # e.g. EmptyResultSet
+            return None
+        return ("queryset", value.model._meta.label, value.db, value._iterable_class.__name__, sql)
+    if isinstance(value, Model):
+        fields = tuple(fingerprint(field.value_from_object(value), depth + 1) for field in value._meta.concrete_fields)
+        if None in fields:
+            return None
+        return ("model", value._meta.label, fields)
+    if isinstance(value, (type, types.ModuleType, types.BuiltinFunctionType)):
+        # Classes, modules and builtins are what their name says they are
+        return ("ref", getattr(value, "__module__", None), getattr(value, "__qualname__", value.__name__))
+    return None
+
+
+def statement_hash(stmt: ast.AST) -> str:
+    """
+    Return a hash of the statement that ignores formatting and comments
+    """
+    return hashlib.blake2b(ast.dump(stmt, annotate_fields=False).encode(), digest_size=20).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    out: str
+    bindings: Dict[str, Any]
+    created: float = field(default_factory=time.monotonic)
+
+
+class ResultCache:
+    """
+    LRU cache of read-only statement results, bounded by size and age. Any
+    statement that isn't read-only, e.g. a database write, clears it.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = False
+        self._entries: OrderedDict[Tuple, CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _inputs(self, stmt: ast.stmt, namespace: Mapping[str, Any]) -> Optional[Tuple]:
+        """
+        Return the fingerprints of the names stmt reads, None if one can't be fingerprinted
+        """
+        inputs = []
+        names = sorted(
+            {node.id for node in ast.walk(stmt) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+        )
+        for name in names:
+            if name not in namespace:
+                continue
+            value = fingerprint(namespace[name])
+            if value is None:
+                return None
+            inputs.append((name, value))
+        return tuple(inputs)
+
+    def _get(self, key: Tuple) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: Tuple, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def execute(
+        self,
+        code: Union[str, ast.Module],
+        globals_: Dict[str, Any],
+        locals_: MutableMapping[str, Any],
+        stdout: StringIO,
+        context: Tuple = (),
+    ) -> List[int]:
+        """
+        Execute code statement by statement, serving read-only statements from the cache.
+        Context is part of every key, e.g. the database alias the code runs against.
+        Return line numbers of the statements that were served from the cache.
+        """
+        served = []
+        namespace = {**globals_, **locals_}
+        tree = ast.parse(code) if isinstance(code, str) else code
+        for stmt in tree.body:
+            key = None
+            read_only = is_read_only(stmt, namespace)
+            inputs = self._inputs(stmt, namespace) if read_only else None
+            if not read_only:
+                # It may have changed anything a cached result was read from
+                self.clear()
+            elif inputs is not None:
+                key = (statement_hash(stmt), inputs, context)
+                entry = self._get(key)
+                if entry is not None:
+                    stdout.write(entry.out)
+                    locals_.update(entry.bindings)
+                    namespace.update(entry.bindings)
+                    served.append(stmt.lineno)
+                    continue
+
+            start = stdout.tell()
+            exec_code(ast.Module(body=[stmt], type_ignores=[]), globals_, locals_)
+            namespace.update(locals_)
+            if key is not None:
+                bindings = {name: locals_[name] for name in bound_names(stmt) if name in locals_}
+                # An iterator served again would already be exhausted
+                if not any(isinstance(value, (Iterator, AsyncIterator)) for value in bindings.values()):
+                    self._put(key, CacheEntry(out=stdout.getvalue()[start:], bindings=bindings))
+        return served
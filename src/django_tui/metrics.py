@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Return the peak resident set size of the process in bytes, None if unknown
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_bytes(size: Optional[float]) -> str:
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return ""
+
+
+@dataclass
+class RunMetrics:
+    wall: float = 0.0
+    cpu: float = 0.0
+    rss_delta: Optional[int] = None
+    traced_peak: Optional[int] = None
+    # (location, size in bytes, allocation count)
+    top_allocations: List[Tuple[str, int, int]] = field(default_factory=list)
+
+    @property
+    def cpu_ratio(self) -> float:
+        return self.cpu / self.wall if self.wall else 0.0
+
+    def summary(self) -> str:
+        parts = [f"{self.wall * 1000:.1f} ms wall", f"{self.cpu * 1000:.1f} ms CPU"]
+        if self.rss_delta is not None:
+            parts.append(f"+{format_bytes(self.rss_delta)} peak RSS")
+        return " · ".join(parts)
+
+
+@contextmanager
+def measure(trace_allocations: bool = False, top: int = 10) -> Iterator[RunMetrics]:
+    """
+    Measure wall time, CPU time and peak RSS growth of the enclosed block.
+    With trace_allocations, tracemalloc also records the top allocating lines.
+    """
+    metrics = RunMetrics()
+    started_tracing = False
+    if trace_allocations:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        elif hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+
+    rss_before = peak_rss()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall = time.perf_counter() - wall_start
+        metrics.cpu = time.process_time() - cpu_start
+        rss_after = peak_rss()
+        if rss_before is not None and rss_after is not None:
+            metrics.rss_delta = rss_after - rss_before
+
+        if trace_allocations:
+            metrics.traced_peak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            )
+            metrics.top_allocations = [
+                (str(stat.traceback), stat.size, stat.count) for stat in snapshot.statistics("lineno")[:top]
+            ]
+        if started_tracing:
+            tracemalloc.stop()
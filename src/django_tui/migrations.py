@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from rich.markup import escape
+from textual import work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import VerticalScroll
+from textual.screen import Screen
+from textual.widgets import DataTable, Footer, Label, Static
+
+from django_tui.databases import get_aliases
+
+# (app label, migration name)
+MigrationKey = Tuple[str, str]
+
+# path -> (mtime, size)
+Fingerprint = Dict[str, Tuple[int, int]]
+
+
+@dataclass
+class MigrationState:
+    # app label -> names of its latest migrations
+    leaf_nodes: Dict[str, List[str]]
+    # alias -> migrations `migrate` would apply, in order
+    unapplied: Dict[str, List[MigrationKey]]
+    # alias -> error that prevented reading the applied migrations
+    errors: Dict[str, str]
+    # app label -> conflicting leaf migrations
+    conflicts: Dict[str, List[str]]
+    total: int
+    computed_at: float = field(default_factory=time.time)
+
+
+def migration_dirs() -> Dict[str, str]:
+    """
+    Return the directory of every app's migrations package mapped to its module name
+    """
+    dirs = {}
+    for app_config in apps.get_app_configs():
+        module_name, _explicit = MigrationLoader.migrations_module(app_config.label)
+        if module_name is None:
+            continue
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except ImportError:
+            continue
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for path in spec.submodule_search_locations:
+            dirs[path] = module_name
+    return dirs
+
+
+def fingerprint(dirs: Dict[str, str]) -> Fingerprint:
+    """
+    Return modification time and size of every migration file, cheap enough to poll
+    """
+    files = {}
+    for path in dirs:
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.endswith(".py") and entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class MigrationCache:
+    """
+    Keeps the migration graph and the unapplied migrations of every alias between
+    refreshes. Only a change on disk or an explicit reload recomputes them, and only
+    the migration modules whose files changed are re-imported.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dirs: Optional[Dict[str, str]] = None
+        self.fingerprint: Fingerprint = {}
+        self.loader: Optional[MigrationLoader] = None
+        self.unapplied: Dict[str, List[MigrationKey]] = {}
+        self.errors: Dict[str, str] = {}
+        self.state: Optional[MigrationState] = None
+
+    def _forget_changed_modules(self, dirs: Dict[str, str], current: Fingerprint) -> None:
+        # The loader imports migration modules, edited files need to be imported anew
+        for path in current.keys() | self.fingerprint.keys():
+            if current.get(path) == self.fingerprint.get(path):
+                continue
+            module_name = dirs.get(os.path.dirname(path))
+            if module_name is not None:
+                sys.modules.pop(f"{module_name}.{os.path.basename(path)[:-3]}", None)
+
+    def _load_plan(self, loader: MigrationLoader, alias: str) -> None:
+        """
+        Compute what `migrate` would apply on alias from the shared graph and the
+        alias' applied migrations, without building a graph per alias. A squashed
+        migration counts as applied once everything it replaces is. The graph
+        always uses the squashed migration, so while only some of the replaced
+        ones are applied, the squashed migration is listed instead of the rest.
+        """
+        try:
+            applied = set(MigrationRecorder(connections[alias]).applied_migrations())
+            for key, migration in loader.replacements.items():
+                if all(replaced in applied for replaced in migration.replaces):
+                    applied.add(key)
+            graph = loader.graph
+            # Plans of different leaves share their dependencies, keep the first occurrence
+            plan = dict.fromkeys(key for target in graph.leaf_nodes() for key in graph.forwards_plan(target))
+            self.unapplied[alias] = [key for key in plan if key not in applied]
+            self.errors.pop(alias, None)
+        except Exception as e:
+            self.unapplied[alias] = []
+            self.errors[alias] = str(e)
+
+    def _compute_state(self, loader: MigrationLoader) -> MigrationState:
+        graph = loader.graph
+        leaf_nodes: Dict[str, List[str]] = {}
+        for app_label, name in graph.leaf_nodes():
+            leaf_nodes.setdefault(app_label, []).append(name)
+        return MigrationState(
+            leaf_nodes=leaf_nodes,
+            unapplied=dict(self.unapplied),
+            errors=dict(self.errors),
+            conflicts=loader.detect_conflicts(),
+            total=len(graph.nodes),
+        )
+
+    def refresh(self, reload_applied: bool = False) -> Tuple[MigrationState, bool]:
+        """
+        Return the current state and whether it was recomputed. Nothing is recomputed
+        unless migration files changed or reload_applied is set.
+        """
+        with self.lock:
+            if self.dirs is None:
+                self.dirs = migration_dirs()
+            current = fingerprint(self.dirs)
+            loader = self.loader
+            disk_changed = loader is None or current != self.fingerprint
+            if disk_changed:
+                if loader is not None:
+                    self._forget_changed_modules(self.dirs, current)
+                # Without a connection, for the graph itself: leaf nodes and conflicts
+                loader = self.loader = MigrationLoader(None, ignore_no_migrations=True)
+                self.fingerprint = current
+            if disk_changed or reload_applied:
+                for alias in get_aliases():
+                    self._load_plan(loader, alias)
+            if disk_changed or reload_applied or self.state is None:
+                self.state = self._compute_state(loader)
+                return self.state, True
+            return self.state, False
+
+
+@lru_cache
+def get_migration_cache():
+    """
+    Return the session wide migration cache
+    """
+    return MigrationCache()
+
+
+class MigrationsScreen(Screen):
+    # Seconds between checks for changed migration files
+    poll_interval = 2.0
+    shown = False
+
+    BINDINGS = [
+        Binding(key="escape", action="app.pop_screen", description="Back"),
+        Binding(key="ctrl+r", action="refresh(True)", description="Reload applied migrations"),
+    ]
+
+    DEFAULT_CSS = """
+    MigrationsScreen DataTable {
+        height: auto;
+        max-height: 24;
+        margin-bottom: 1;
+    }
+
+    MigrationsScreen Label, MigrationsScreen Static {
+        padding: 0 1;
+    }
+    """
+
+    def compose(self) -> ComposeResult:
+        with VerticalScroll():
+            yield Static("Analyzing migrations...", id="migrations-summary")
+            yield Label("Apps")
+            yield DataTable(id="migrations-apps", zebra_stripes=True)
+            yield Label("Unapplied migrations")
+            yield DataTable(id="migrations-unapplied", zebra_stripes=True)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.query_one("#migrations-unapplied", DataTable).add_columns("Database", "App", "Migration")
+        self.action_refresh()
+        self.set_interval(self.poll_interval, self.action_refresh)
+
+    def action_refresh(self, reload_applied: bool = False) -> None:
+        self._refresh(reload_applied)
+
+    @work(thread=True, exclusive=True, group="migrations")
+    def _refresh(self, reload_applied: bool) -> None:
+        try:
+            state, changed = get_migration_cache().refresh(reload_applied)
+        except Exception as e:
+            # e.g. a migration file with a syntax error while it is being edited
+            self.app.call_from_thread(self._show_error, e)
+            return
+        finally:
+            connections.close_all()
+        if changed or not self.shown:
+            self.app.call_from_thread(self._show_state, state)
+
+    def _show_error(self, error: Exception) -> None:
+        if self.is_attached:
+            self.query_one("#migrations-summary", Static).update(
+                f"[red]Could not load migrations: {escape(f'{type(error).__name__}: {error}')}[/]"
+            )
+
+    def _show_state(self, state: MigrationState) -> None:
+        if not self.is_attached:
+            return
+        self.shown = True
+        aliases = list(state.unapplied)
+        summary = [
+            (
+                f"{state.total} migrations in {len(state.leaf_nodes)} apps, "
+                f"analyzed at {time.strftime('%H:%M:%S', time.localtime(state.computed_at))}."
+            )
+        ]
+        for alias in aliases:
+            count = len(state.unapplied[alias])
+            if alias in state.errors:
+                summary.append(f"{alias}: could not read applied migrations ({state.errors[alias]})")
+            else:
+                summary.append(f"{alias}: {count or 'no'} unapplied migration(s)")
+        if state.conflicts:
+            for app_label, names in state.conflicts.items():
+                summary.append(f"[red]Conflict in {app_label}: {', '.join(names)}[/]")
+        else:
+            summary.append("No conflicts.")
+        self.query_one("#migrations-summary", Static).update("\n".join(summary))
+
+        apps_table = self.query_one("#migrations-apps", DataTable)
+        apps_table.clear(columns=True)
+        apps_table.add_columns("App", "Latest migration", *aliases)
+        for app_label in sorted(state.leaf_nodes):
+            pending = [sum(1 for key in state.unapplied[alias] if key[0] == app_label) for alias in aliases]
+            apps_table.add_row(
+                app_label,
+                ", ".join(state.leaf_nodes[app_label]),
+                *(f"{count} unapplied" if count else "up to date" for count in pending),
+            )
+
+        unapplied_table = self.query_one("#migrations-unapplied", DataTable)
+        unapplied_table.clear()
+        for alias in aliases:
+            for app_label, name in state.unapplied[alias]:
+                unapplied_table.add_row(alias, app_label, name)
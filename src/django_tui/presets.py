@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import warnings
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from textual import on
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Button, Checkbox, Input, Label, OptionList, Select
+from textual.widgets.option_list import Option
+from textual.widgets.select import InvalidSelectValueError
+from trogon.run_command import UserCommandData
+from trogon.widgets.form import CommandForm
+from trogon.widgets.multiple_choice import MultipleChoice
+from trogon.widgets.parameter_controls import (
+    ControlGroup,
+    ControlGroupsContainer,
+    ParameterControls,
+    ValueNotSupplied,
+)
+
+PRESETS_FILENAME = ".django-tui-presets.json"
+
+# Recent invocations kept per command
+MAX_RECENT = 10
+
+
+@dataclass
+class Invocation:
+    command: str
+    # Arguments after `manage.py`, starting with the command name
+    args: List[str]
+    # Parameter name -> values of every control group, None for empty controls
+    values: Dict[str, List[List[Any]]] = field(default_factory=dict)
+
+
+def _parameter_name(name) -> str:
+    return name if isinstance(name, str) else name[0]
+
+
+def _json_value(value: Any) -> Any:
+    return None if value == ValueNotSupplied() else value
+
+
+def invocation_from_command_data(command_data: UserCommandData) -> Invocation:
+    """
+    Capture what was filled into the form. Trogon's parameter keys are random per
+    session, so values are keyed on parameter names instead.
+    """
+    values: Dict[str, List[List[Any]]] = {}
+    node: Optional[UserCommandData] = command_data
+    command = command_data.name
+    while node is not None:
+        command = node.name
+        for data in [*node.options, *node.arguments]:
+            value = [_json_value(v) for v in data.value]
+            if all(v is None or v is False for v in value):
+                continue
+            values.setdefault(_parameter_name(data.name), []).append(value)
+        node = node.subcommand
+    args = [str(arg) for arg in command_data.to_cli_args() if arg != ValueNotSupplied()]
+    return Invocation(command=command, args=args, values=values)
+
+
+def presets_path() -> str:
+    """
+    Return the presets file of the project, next to the project's BASE_DIR if it has one
+    """
+    path = os.environ.get("DJANGO_TUI_PRESETS")
+    if path:
+        return path
+    base_dir = getattr(settings, "BASE_DIR", None) or os.getcwd()
+    return os.path.join(str(base_dir), PRESETS_FILENAME)
+
+
+class PresetStore:
+    """
+    Named presets and the most recent invocations of every command, stored as JSON
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.presets: Dict[str, Invocation] = {}
+        self.recent: Dict[str, List[Invocation]] = {}
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            presets = {name: Invocation(**item) for name, item in data.get("presets", {}).items()}
+            recent = {
+                command: [Invocation(**item) for item in items] for command, items in data.get("recent", {}).items()
+            }
+        except FileNotFoundError:
+            return
+        except (ValueError, TypeError, AttributeError) as e:
+            # A corrupt or hand edited file shouldn't keep the TUI from starting
+            warnings.warn(f"Ignoring unreadable presets file {self.path}: {e}", RuntimeWarning)
+            return
+        self.presets = presets
+        self.recent = recent
+
+    def save(self) -> None:
+        data = {
+            "presets": {name: asdict(item) for name, item in self.presets.items()},
+            "recent": {command: [asdict(item) for item in items] for command, items in self.recent.items()},
+        }
+        # Write to a temporary file first so a crash never leaves a truncated file behind
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".django-tui-", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def presets_for(self, command: str) -> Dict[str, Invocation]:
+        return {name: item for name, item in self.presets.items() if item.command == command}
+
+    def save_preset(self, name: str, invocation: Invocation) -> None:
+        self.presets[name] = invocation
+        self.save()
+
+    def delete_preset(self, name: str) -> None:
+        if self.presets.pop(name, None) is not None:
+            self.save()
+
+    def record(self, invocation: Invocation) -> None:
+        """
+        Move the invocation to the front of the command's recent invocations
+        """
+        recent = [item for item in self.recent.get(invocation.command, []) if item.args != invocation.args]
+        self.recent[invocation.command] = [invocation, *recent][:MAX_RECENT]
+        self.save()
+
+
+@lru_cache
+def get_preset_store() -> PresetStore:
+    """
+    Return the presets of the current project
+    """
+    return PresetStore(presets_path())
+
+
+def _set_control_value(control, value: Any) -> None:
+    if isinstance(control, Checkbox):
+        control.value = bool(value)
+    elif isinstance(control, Select):
+        try:
+            control.value = Select.BLANK if value is None else value
+        except InvalidSelectValueError:
+            # The choices changed since the preset was saved
+            pass
+    elif isinstance(control, Input):
+        control.value = "" if value is None else str(value)
+
+
+async def fill_form(form: CommandForm, values: Dict[str, List[List[Any]]]) -> None:
+    """
+    Set the controls of a mounted form to stored values, adding control groups as needed
+    """
+    for command in form.command_schema.path_from_root:
+        for schema in [*command.options, *command.arguments]:
+            stored = values.get(_parameter_name(schema.name))
+            parameter = form.query_one(f"#{schema.key}", ParameterControls)
+            controls = list(parameter.query(f".{schema.key}"))
+            if len(controls) == 1 and isinstance(controls[0], MultipleChoice):
+                selected = {str(value[0]) for value in stored or []}
+                for checkbox in controls[0].query(Checkbox):
+                    checkbox.value = checkbox.label.plain in selected
+                continue
+            flat = [value for group in stored or [] for value in group]
+            while len(controls) < len(flat):
+                group = ControlGroup(*parameter.make_widget_group())
+                await parameter.query_one(ControlGroupsContainer).mount(group)
+                controls = list(parameter.query(f".{schema.key}"))
+            for index, control in enumerate(controls):
+                _set_control_value(control, flat[index] if index < len(flat) else None)
+
+
+class PresetsScreen(ModalScreen[Optional[Invocation]]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+        Binding("delete", "delete_preset", "Delete preset"),
+    ]
+
+    DEFAULT_CSS = """
+    PresetsScreen {
+        align: center middle;
+    }
+
+    PresetsScreen > Vertical {
+        width: 100;
+        height: auto;
+        border: thick $primary 50%;
+        background: $surface;
+        padding: 1 2;
+    }
+
+    PresetsScreen OptionList {
+        height: auto;
+        max-height: 20;
+    }
+
+    PresetsScreen Horizontal {
+        height: auto;
+        margin-top: 1;
+    }
+
+    PresetsScreen Input {
+        width: 1fr;
+    }
+    """
+
+    def __init__(
+        self,
+        command: str,
+        current: Optional[Invocation] = None,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.command = command
+        self.current = current
+        self.invocations: Dict[str, Invocation] = {}
+        super().__init__(name, id, classes)
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Label(f"Presets and recent invocations of [b]{self.command}[/]")
+            yield OptionList(id="presets-list")
+            with Horizontal():
+                yield Input(placeholder="Preset name", id="presets-name")
+                yield Button("Save preset", id="presets-save", variant="primary", disabled=self.current is None)
+
+    def on_mount(self) -> None:
+        self._show_invocations()
+        self.query_one(OptionList).focus()
+
+    def _show_invocations(self) -> None:
+        store = get_preset_store()
+        option_list = self.query_one(OptionList)
+        option_list.clear_options()
+        self.invocations = {}
+        for preset_name, invocation in sorted(store.presets_for(self.command).items()):
+            self.invocations[f"preset:{preset_name}"] = invocation
+            option_list.add_option(Option(f"★ {preset_name}  {' '.join(invocation.args)}", id=f"preset:{preset_name}"))
+        for index, invocation in enumerate(store.recent.get(self.command, [])):
+            self.invocations[f"recent:{index}"] = invocation
+            option_list.add_option(Option(" ".join(invocation.args), id=f"recent:{index}"))
+        if not self.invocations:
+            option_list.add_option(Option("No presets or recent invocations yet", disabled=True))
+        else:
+            option_list.highlighted = 0
+
+    @on(OptionList.OptionSelected)
+    def load_invocation(self, event: OptionList.OptionSelected) -> None:
+        invocation = self.invocations.get(event.option.id or "")
+        if invocation is not None:
+            self.dismiss(invocation)
+
+    @on(Button.Pressed, "#presets-save")
+    @on(Input.Submitted, "#presets-name")
+    def save_preset(self) -> None:
+        preset_name = self.query_one("#presets-name", Input).value.strip()
+        if not preset_name or self.current is None:
+            self.notify("Enter a preset name.", severity="warning")
+            return
+        get_preset_store().save_preset(preset_name, self.current)
+        self.notify(f"Saved preset `{preset_name}`. Run it with `tui --preset {preset_name}`.")
+        self._show_invocations()
+
+    def action_delete_preset(self) -> None:
+        option_list = self.query_one(OptionList)
+        if option_list.highlighted is None:
+            return
+        option_id = option_list.get_option_at_index(option_list.highlighted).id or ""
+        if option_id.startswith("preset:"):
+            get_preset_store().delete_preset(option_id[len("preset:") :])
+            self._show_invocations()
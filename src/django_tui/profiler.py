@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from rich.text import Text
+from textual import on
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical, VerticalScroll
+from textual.screen import ModalScreen
+from textual.widget import Widget
+from textual.widgets import DataTable, Label, TabbedContent, TabPane
+
+# (filename, first line, function name), the same key pstats uses
+FrameKey = Tuple[str, int, str]
+
+# Filenames of code objects compiled from shell snippets
+SNIPPET_FILENAMES = {"<string>", "<input>"}
+
+ROOT_KEY: FrameKey = ("", 0, "<snippet>")
+
+FLAME_COLORS = ["#c75d3a", "#d9893b", "#e0a84a", "#b9753c", "#cf6f4f", "#e39a5c", "#a8622e"]
+
+
+def frame_label(key: FrameKey) -> str:
+    filename, line, name = key
+    if not filename or filename.startswith("~"):
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+@dataclass
+class CallNode:
+    key: FrameKey
+    value: float = 0.0
+    self_value: float = 0.0
+    children: Dict[FrameKey, CallNode] = field(default_factory=dict)
+
+    def child(self, key: FrameKey) -> CallNode:
+        if key not in self.children:
+            self.children[key] = CallNode(key)
+        return self.children[key]
+
+    def depth(self) -> int:
+        return 1 + max((child.depth() for child in self.children.values()), default=0)
+
+
+@dataclass
+class FunctionStat:
+    key: FrameKey
+    calls: Optional[int]
+    self_time: float
+    total_time: float
+
+
+@dataclass
+class ProfileResult:
+    kind: str
+    root: CallNode
+    # pstats compatible: key -> (primitive calls, calls, self time, total time, callers)
+    stats: Dict[FrameKey, Tuple[int, int, float, float, Dict]]
+
+    def functions(self) -> List[FunctionStat]:
+        calls_known = self.kind == "cProfile"
+        return sorted(
+            (
+                FunctionStat(key=key, calls=nc if calls_known else None, self_time=tt, total_time=ct)
+                for key, (_cc, nc, tt, ct, _callers) in self.stats.items()
+            ),
+            key=lambda stat: stat.self_time,
+            reverse=True,
+        )
+
+    def export_pstats(self, path: str) -> None:
+        with open(path, "wb") as f:
+            marshal.dump(self.stats, f)
+
+    def export_speedscope(self, path: str, name: str = "django-tui shell") -> None:
+        frames: List[Dict] = []
+        frame_index: Dict[FrameKey, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        def walk(node: CallNode, stack: List[int]) -> None:
+            if node.self_value > 0:
+                samples.append(stack)
+                weights.append(node.self_value)
+            for key, child in node.children.items():
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[2], "file": key[0], "line": key[1]})
+                walk(child, [*stack, frame_index[key]])
+
+        walk(self.root, [])
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.root.value,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": name,
+            "exporter": "django-tui",
+        }
+        with open(path, "w") as f:
+            json.dump(document, f)
+
+
+def export_dir() -> str:
+    """
+    Return the directory profiles are exported to, created if needed
+    """
+    path = os.environ.get("DJANGO_TUI_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "django-tui-profiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class SamplingProfiler:
+    """
+    Low overhead profiler that samples stacks on SIGPROF, i.e. every `interval`
+    seconds of CPU time. The signal arrives on the main thread, but every thread
+    is sampled, so snippets running on the shell's event loop thread are too.
+    """
+
+    kind = "sampling"
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Counter[Tuple[FrameKey, ...]] = Counter()
+        self._previous_handler = None
+
+    @staticmethod
+    def available() -> bool:
+        return (
+            hasattr(signal, "setitimer")
+            and hasattr(signal, "SIGPROF")
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    def _sample(self, signum, frame) -> None:
+        frames = sys._current_frames()
+        # The handler's own frame is on top of the main thread's stack, start below it
+        frames[threading.get_ident()] = frame
+        for thread_frame in frames.values():
+            self._add_stack(thread_frame)
+
+    def _add_stack(self, frame) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        # Only keep frames from the outermost snippet frame inwards
+        for index, key in enumerate(stack):
+            if key[0] in SNIPPET_FILENAMES:
+                self.samples[tuple(stack[index:])] += 1
+                break
+
+    def __enter__(self) -> SamplingProfiler:
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+
+    def result(self) -> ProfileResult:
+        root = CallNode(ROOT_KEY)
+        counts: Counter[FrameKey] = Counter()
+        self_time: Counter[FrameKey] = Counter()
+        total_time: Counter[FrameKey] = Counter()
+        callers: Dict[FrameKey, Counter[FrameKey]] = defaultdict(Counter)
+
+        for stack, count in self.samples.items():
+            weight = count * self.interval
+            node = root
+            node.value += weight
+            for key in stack:
+                node = node.child(key)
+                node.value += weight
+            node.self_value += weight
+
+            self_time[stack[-1]] += weight
+            for key in set(stack):
+                counts[key] += count
+                total_time[key] += weight
+            for caller, callee in set(zip(stack, stack[1:])):
+                callers[callee][caller] += count
+
+        stats = {
+            key: (
+                counts[key],
+                counts[key],
+                self_time[key],
+                total_time[key],
+                {caller: (count, count, 0.0, count * self.interval) for caller, count in callers[key].items()},
+            )
+            for key in counts
+        }
+        return ProfileResult(kind=self.kind, root=root, stats=stats)
+
+
+class CProfileProfiler:
+    """
+    Deterministic fallback for platforms or threads where sampling is not possible
+    """
+
+    kind = "cProfile"
+    max_depth = 64
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self) -> CProfileProfiler:
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profile.disable()
+
+    def result(self) -> ProfileResult:
+        stats = pstats.Stats(self.profile).stats
+        callees: Dict[FrameKey, Dict[FrameKey, float]] = defaultdict(dict)
+        for key, (_cc, _nc, _tt, _ct, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees[caller][key] = edge[3] if isinstance(edge, tuple) else 0.0
+
+        def build(node: CallNode, path: set, depth: int) -> None:
+            if depth >= self.max_depth:
+                return
+            for key, total in callees[node.key].items():
+                if key in path:
+                    continue
+                child = node.child(key)
+                child.value = total
+                build(child, path | {key}, depth + 1)
+            node.self_value = max(node.value - sum(child.value for child in node.children.values()), 0.0)
+
+        root = CallNode(ROOT_KEY)
+        for key, (_cc, _nc, _tt, ct, _callers) in stats.items():
+            if key[0] in SNIPPET_FILENAMES and key[2] == "<module>":
+                child = root.child(key)
+                child.value = ct
+                root.value += ct
+                build(child, {key}, 1)
+        return ProfileResult(kind=self.kind, root=root, stats=stats)
+
+
+def make_profiler():
+    """
+    Return the sampling profiler when possible, cProfile otherwise
+    """
+    if SamplingProfiler.available():
+        return SamplingProfiler()
+    return CProfileProfiler()
+
+
+class FlameGraph(Widget):
+    """Icicle view of a call tree: callers on top, callees below, width proportional to time."""
+
+    DEFAULT_CSS = """
+    FlameGraph {
+        height: auto;
+    }
+    """
+
+    def __init__(self, root: CallNode, max_depth: int = 40, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.max_depth = max_depth
+
+    def get_content_height(self, container, viewport, width: int) -> int:
+        return min(self.root.depth(), self.max_depth)
+
+    def render(self) -> Text:
+        width = self.size.width
+        rows: List[List[Tuple[int, int, CallNode]]] = []
+
+        def place(node: CallNode, x: int, node_width: int, depth: int) -> None:
+            if depth >= self.max_depth or node_width < 1:
+                return
+            while len(rows) <= depth:
+                rows.append([])
+            rows[depth].append((x, node_width, node))
+            offset = 0.0
+            for child in sorted(node.children.values(), key=lambda child: -child.value):
+                child_x = x + round(offset)
+                offset += child.value / node.value * node_width if node.value else 0
+                place(child, child_x, x + round(offset) - child_x, depth + 1)
+
+        if self.root.value:
+            place(self.root, 0, width, 0)
+
+        text = Text()
+        for row in rows:
+            cursor = 0
+            for x, node_width, node in row:
+                if x > cursor:
+                    text.append(" " * (x - cursor))
+                label = frame_label(node.key)
+                share = node.value / self.root.value
+                label = f"{label} {share:.0%}"[:node_width].ljust(node_width)
+                color = FLAME_COLORS[hash(node.key) % len(FLAME_COLORS)]
+                text.append(label, style=f"black on {color}")
+                cursor = x + node_width
+            text.append("\n")
+        text.rstrip()
+        return text
+
+
+class ProfileScreen(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+        Binding("s", "export('speedscope')", "Export speedscope"),
+        Binding("p", "export('pstats')", "Export pstats"),
+    ]
+
+    DEFAULT_CSS = """
+    ProfileScreen {
+        align: center middle;
+    }
+
+    ProfileScreen > Vertical {
+        width: 95%;
+        height: 90%;
+        border: thick $primary 50%;
+        background: $surface;
+    }
+"""
+
+    def __init__(
+        self,
+        profile: ProfileResult,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.profile = profile
+        self._sort_reverse = True
+        super().__init__(name, id, classes)
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Label(
+                f"{self.profile.kind} profile, {self.profile.root.value * 1000:.1f} ms profiled. "
+                f"Press s or p to export as speedscope or pstats into {export_dir()}."
+            )
+            with TabbedContent():
+                with TabPane("Flame graph"):
+                    with VerticalScroll():
+                        yield FlameGraph(self.profile.root)
+                with TabPane("Top functions"):
+                    yield DataTable(zebra_stripes=True, cursor_type="row")
+
+    def on_mount(self) -> None:
+        table = self.query_one(DataTable)
+        table.add_column("Function", key="function")
+        table.add_column("Location", key="location")
+        table.add_column("Calls", key="calls")
+        table.add_column("Self (ms)", key="self")
+        table.add_column("Total (ms)", key="total")
+        for stat in self.profile.functions():
+            filename, line, name = stat.key
+            table.add_row(
+                name,
+                f"{filename}:{line}" if line else filename,
+                stat.calls if stat.calls is not None else "",
+                round(stat.self_time * 1000, 2),
+                round(stat.total_time * 1000, 2),
+            )
+
+    @on(DataTable.HeaderSelected)
+    def sort_functions(self, event: DataTable.HeaderSelected) -> None:
+        self._sort_reverse = not self._sort_reverse
+        event.data_table.sort(event.column_key, reverse=self._sort_reverse)
+
+    def action_export(self, file_format: str) -> None:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        try:
+            if file_format == "speedscope":
+                path = os.path.join(export_dir(), f"django-tui-profile-{stamp}.speedscope.json")
+                self.profile.export_speedscope(path)
+            else:
+                path = os.path.join(export_dir(), f"django-tui-profile-{stamp}.pstats")
+                self.profile.export_pstats(path)
+        except OSError as e:
+            self.notify(f"Could not export the profile: {e}", severity="error")
+            return
+        self.notify(f"Profile exported to {path}")
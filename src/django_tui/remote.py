@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from dataclasses import asdict
+from typing import IO, Any, Callable, Dict, Optional
+
+import django
+from django.conf import settings
+from django.db import connections
+from textual import on
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label
+
+from django_tui.capture import install_stdout
+from django_tui.metrics import RunMetrics
+
+# Snippets share the shell's scope and the result cache, so they run one at a time
+EXECUTION_LOCK = threading.Lock()
+
+
+def default_socket_path() -> str:
+    """
+    Return the socket path agents listen on unless told otherwise
+    """
+    path = os.environ.get("DJANGO_TUI_AGENT_SOCKET")
+    if path:
+        return path
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"django-tui-{uid}.sock")
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    # Values that aren't JSON, e.g. lazy strings, are sent as their str()
+    return json.dumps(message, default=str).encode() + b"\n"
+
+
+def result_to_message(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {**result, "metrics": asdict(result["metrics"])}
+
+
+def message_to_result(message: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = message["metrics"]
+    metrics["top_allocations"] = [tuple(item) for item in metrics["top_allocations"]]
+    return {**message, "metrics": RunMetrics(**metrics)}
+
+
+class StreamedOutput:
+    """
+    Sends what a run prints as output messages while it runs. A write starts a
+    timer and everything printed until it fires goes out as one message, so code
+    that prints a lot doesn't turn every write into a message and code that
+    prints once and then works for a while still shows its output.
+    """
+
+    def __init__(self, send: Callable[[Dict[str, Any]], None], request_id: Any, interval: float = 0.1):
+        self.send = send
+        self.request_id = request_id
+        self.interval = interval
+        self.pending = []
+        # Held while sending too, so the final flush can't overtake the timer's
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def __call__(self, text: str) -> None:
+        with self.lock:
+            self.pending.append(text)
+            if self.timer is None:
+                self.timer = threading.Timer(self.interval, self._flush_later)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _flush_later(self) -> None:
+        try:
+            self.flush()
+        except OSError:
+            # The client went away, sending the response reports it
+            pass
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.pending:
+                self.send({"id": self.request_id, "output": "".join(self.pending)})
+                self.pending = []
+
+
+def close_broken_connections() -> None:
+    """
+    Close the connections of this thread that a run left unusable, e.g. after the
+    server went away. Working connections stay open for the next run.
+    """
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def handle_request(request: Dict[str, Any], output: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Execute one request of the agent protocol and return the response,
+    output receives what a run prints while it runs
+    """
+    from django_tui.management.commands.ish import get_result_cache, run_code
+
+    op = request.get("op")
+    if op == "ping":
+        return {
+            "pid": os.getpid(),
+            "python": platform.python_version(),
+            "django": django.__version__,
+            "settings": settings.SETTINGS_MODULE,
+        }
+    if op == "run":
+        with EXECUTION_LOCK:
+            try:
+                result = run_code(
+                    request["code"],
+                    cache=get_result_cache() if request.get("cache") else None,
+                    alias=request.get("alias"),
+                    rollback=request.get("rollback", False),
+                    trace_allocations=request.get("trace_allocations", False),
+                    output=output,
+                )
+            finally:
+                close_broken_connections()
+        return result_to_message(result)
+    return {"error": f"Unknown operation {op!r}"}
+
+
+def serve(rfile: IO[bytes], wfile: IO[bytes], handler: Callable[..., Dict[str, Any]] = handle_request) -> None:
+    """
+    Answer JSON line requests from rfile on wfile until rfile is closed. Requests
+    with stream set also get output messages before their response.
+    """
+
+    def send(message: Dict[str, Any]) -> None:
+        wfile.write(encode(message))
+        wfile.flush()
+
+    for line in rfile:
+        try:
+            request = json.loads(line)
+            output = StreamedOutput(send, request.get("id")) if request.get("stream") else None
+            response = handler(request, output)
+            if output is not None:
+                output.flush()
+        except Exception as e:
+            request, response = {}, {"error": f"{type(e).__name__}: {e}"}
+        response["id"] = request.get("id")
+        send(response)
+
+
+def check_owner(path: str, st: Optional[os.stat_result] = None) -> None:
+    """
+    Refuse a socket another user owns. Whoever listens on it gets the code we
+    send and decides what it prints, in a shared directory like /tmp anyone
+    could have created it first.
+    """
+    st = st or os.stat(path)
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        msg = f"{path} is owned by another user"
+        raise RuntimeError(msg)
+
+
+def remove_stale_socket(path: str) -> None:
+    """
+    Remove a socket left behind by an agent that didn't shut down cleanly. Refuse
+    to remove anything that isn't a socket, a socket of another user, or a socket
+    another agent still listens on.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return
+    check_owner(path, st)
+    if not stat.S_ISSOCK(st.st_mode):
+        msg = f"{path} exists and is not a socket"
+        raise RuntimeError(msg)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    msg = f"Another agent is listening on {path}"
+    raise RuntimeError(msg)
+
+
+class AgentHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            serve(self.rfile, self.wfile)
+        finally:
+            # Every client is served by its own thread, which has its own connections
+            connections.close_all()
+
+
+# Only defined where there are Unix domain sockets, AgentServer refuses to start elsewhere
+_UnixServer = getattr(socketserver, "ThreadingUnixStreamServer", socketserver.BaseServer)
+
+
+class AgentServer(_UnixServer):
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        if not hasattr(socket, "AF_UNIX"):
+            msg = "Unix domain sockets are not supported on this platform"
+            raise RuntimeError(msg)
+        remove_stale_socket(path)
+        # The agent executes arbitrary code, only the owner may connect
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, AgentHandler)
+        finally:
+            os.umask(umask)
+        self.path = path
+        # Runs capture their output per thread, without swapping sys.stdout
+        install_stdout()
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def start_agent(path: Optional[str] = None) -> AgentServer:
+    """
+    Serve the shell protocol on a Unix domain socket from a background thread,
+    so `tui --attach` can run code inside this process. Call it from e.g.
+    AppConfig.ready() of a development server.
+    """
+    server = AgentServer(path or default_socket_path())
+    threading.Thread(target=server.serve_forever, name="django-tui-agent", daemon=True).start()
+    return server
+
+
+class RemoteExecutor:
+    """
+    Runs shell code in another process through its agent
+    """
+
+    def __init__(self, path: str):
+        check_owner(path)
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.file = self.sock.makefile("rwb")
+        self.rfile = self.wfile = self.file
+        self.next_id = 0
+        self.info = self._request({"op": "ping"})
+
+    @property
+    def description(self) -> str:
+        return f"pid {self.info['pid']} ({self.info['settings']})"
+
+    def _request(self, request: Dict[str, Any], output: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        self.next_id += 1
+        self.wfile.write(encode({**request, "id": self.next_id, "stream": output is not None}))
+        self.wfile.flush()
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                msg = "The agent closed the connection"
+                raise ConnectionError(msg)
+            try:
+                response = json.loads(line)
+            except ValueError as e:
+                # The stream is out of step, later responses can't be matched up either
+                msg = f"The agent sent an invalid response: {line[:80]!r}"
+                raise ConnectionError(msg) from e
+            if "output" not in response:
+                break
+            if output is not None:
+                output(response["output"])
+        if "error" in response:
+            msg = response["error"]
+            raise RuntimeError(msg)
+        return response
+
+    def run(self, code, cache=False, alias=None, rollback=False, trace_allocations=False, profiler=None, output=None):
+        response = self._request(
+            {
+                "op": "run",
+                "code": code,
+                "cache": cache,
+                "alias": alias,
+                "rollback": rollback,
+                "trace_allocations": trace_allocations,
+            },
+            output,
+        )
+        return message_to_result(response)
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+
+class AttachScreen(ModalScreen[Optional[str]]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+    ]
+
+    DEFAULT_CSS = """
+    AttachScreen {
+        align: center middle;
+    }
+
+    AttachScreen > Vertical {
+        width: 80;
+        height: auto;
+        border: thick $primary 50%;
+        background: $surface;
+        padding: 1 2;
+    }
+    """
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Label("Socket of the agent to attach to, started with `manage.py tui_agent` or start_agent()")
+            yield Input(default_socket_path(), id="attach-path")
+
+    @on(Input.Submitted, "#attach-path")
+    def attach(self, event: Input.Submitted) -> None:
+        self.dismiss(event.value.strip() or None)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+import django
+from django.conf import settings
+
+from django_tui.capture import install_stdout
+from django_tui.remote import RemoteExecutor, handle_request, serve
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Address space of the sandbox process in MB, it covers everything Django itself maps too
+DEFAULT_MEMORY_LIMIT = 2048
+
+# CPU seconds a single run may use before the sandbox process is killed
+DEFAULT_CPU_LIMIT = 60
+
+
+def memory_limit() -> int:
+    return int(os.environ.get("DJANGO_TUI_SANDBOX_MEMORY", DEFAULT_MEMORY_LIMIT))
+
+
+def cpu_limit() -> int:
+    return int(os.environ.get("DJANGO_TUI_SANDBOX_CPU", DEFAULT_CPU_LIMIT))
+
+
+def limit_memory(megabytes: int) -> None:
+    """
+    Cap the address space of this process, allocations past it raise MemoryError
+    """
+    if megabytes:
+        soft = megabytes * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def limit_cpu(seconds: int) -> None:
+    """
+    Let this process use seconds more CPU time, past it the kernel sends SIGXCPU
+    which kills it. RLIMIT_CPU counts the process' whole life, so it is moved
+    forward before every run.
+    """
+    if seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime) + 1 + seconds
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def exit_reason(returncode: int, cpu: int) -> str:
+    """
+    Describe why the sandbox process exited
+    """
+    if returncode == -signal.SIGXCPU:
+        return f"it used more than {cpu} s of CPU time"
+    if returncode == -signal.SIGKILL:
+        return "it was killed, most likely by the kernel running out of memory"
+    if returncode < 0:
+        return f"it was killed by {signal.Signals(-returncode).name}"
+    return f"it exited with status {returncode}"
+
+
+class SandboxKilledError(Exception):
+    """
+    The sandbox process died during a run, a fresh one has been started
+    """
+
+
+class SandboxExecutor(RemoteExecutor):
+    """
+    Runs shell code in a child Django process with capped memory and CPU time,
+    speaking the agent protocol over its stdin and stdout
+    """
+
+    def __init__(self, memory: Optional[int] = None, cpu: Optional[int] = None):
+        if resource is None:
+            msg = "The sandbox needs the resource module, which is only available on Unix"
+            raise RuntimeError(msg)
+        self.memory = memory_limit() if memory is None else memory
+        self.cpu = cpu_limit() if cpu is None else cpu
+        self.closed = False
+        self._start()
+
+    def _start(self) -> None:
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+            # The child imports the project the same way this process does
+            "PYTHONPATH": os.pathsep.join(path or os.getcwd() for path in sys.path),
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "django_tui.sandbox", "--memory", str(self.memory), "--cpu", str(self.cpu)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # Anything the child writes to stderr would end up on top of the TUI
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        self.rfile, self.wfile = self.process.stdout, self.process.stdin
+        self.next_id = 0
+        try:
+            self.info = self._request({"op": "ping"})
+        except ConnectionError as e:
+            msg = f"The sandbox process didn't start, {self._wait()}"
+            raise RuntimeError(msg) from e
+
+    def _wait(self) -> str:
+        try:
+            returncode = self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            returncode = self.process.wait()
+        return exit_reason(returncode, self.cpu)
+
+    @property
+    def description(self) -> str:
+        memory = f"{self.memory} MB" if self.memory else "unlimited memory"
+        cpu = f"{self.cpu} s CPU per run" if self.cpu else "unlimited CPU"
+        return f"sandbox pid {self.info['pid']} ({memory}, {cpu})"
+
+    def run(self, code, cache=False, alias=None, rollback=False, trace_allocations=False, profiler=None, output=None):
+        try:
+            return super().run(code, cache, alias, rollback, trace_allocations, profiler, output)
+        except ConnectionError as e:
+            if self.closed:
+                raise
+            reason = self._wait()
+            self.rfile.close()
+            self.wfile.close()
+            self._start()
+            msg = f"The sandbox process died because {reason}. Restarted it, its variables are gone."
+            raise SandboxKilledError(msg) from e
+
+    def close(self) -> None:
+        self.closed = True
+        # The child exits once its stdin is closed
+        try:
+            self.wfile.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.rfile.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the django-tui shell on stdin and stdout with capped resources")
+    parser.add_argument(
+        "--memory", type=int, default=DEFAULT_MEMORY_LIMIT, help="Address space limit in MB, 0 for none"
+    )
+    parser.add_argument("--cpu", type=int, default=DEFAULT_CPU_LIMIT, help="CPU seconds per run, 0 for none")
+    args = parser.parse_args(argv)
+
+    # Keep the protocol on the original stdout, code that writes to fd 1 directly goes to stderr instead
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    install_stdout()
+
+    os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"
+    django.setup()
+    limit_memory(args.memory)
+
+    def handler(request: Dict[str, Any], output: Any = None) -> Dict[str, Any]:
+        if request.get("op") == "run":
+            limit_cpu(args.cpu)
+        return handle_request(request, output)
+
+    serve(sys.stdin.buffer, protocol, handler)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional, Tuple
+
+from django.apps import apps
+from django.db import DatabaseError, connections, router
+from rich.markup import escape
+from textual import on, work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import VerticalScroll
+from textual.screen import Screen
+from textual.widgets import DataTable, Footer, Label, Static, Tree
+
+# Catalog queries that return a row count estimate for a table without scanning it
+ROW_ESTIMATE_SQL = {
+    "postgresql": "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+    "sqlite": "SELECT stat FROM sqlite_stat1 WHERE tbl = %s",
+    "mysql": "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+    "oracle": "SELECT num_rows FROM user_tables WHERE table_name = UPPER(%s)",
+}
+
+# Tables the catalog has no estimate for are counted, but only up to this many rows
+MAX_COUNTED_ROWS = 100_000
+
+
+@dataclass
+class FieldInfo:
+    name: str
+    type: str
+    column: Optional[str]
+    null: bool
+    primary_key: bool
+    unique: bool
+    db_index: bool
+
+
+@dataclass
+class RelationInfo:
+    name: str
+    kind: str
+    related_model: str
+
+
+@dataclass
+class ModelInfo:
+    app_label: str
+    name: str
+    label: str
+    db_table: str
+    fields: List[FieldInfo] = field(default_factory=list)
+    # (name, fields)
+    indexes: List[Tuple[str, str]] = field(default_factory=list)
+    relations: List[RelationInfo] = field(default_factory=list)
+
+
+def _relation_kind(model_field) -> str:
+    if model_field.many_to_many:
+        return "many to many"
+    if model_field.one_to_one:
+        return "one to one"
+    if model_field.many_to_one:
+        return "many to one"
+    return "one to many"
+
+
+def describe_model(model) -> ModelInfo:
+    opts = model._meta
+    info = ModelInfo(app_label=opts.app_label, name=model.__name__, label=opts.label, db_table=opts.db_table)
+    for model_field in opts.get_fields(include_hidden=False):
+        if model_field.is_relation and model_field.related_model is not None:
+            info.relations.append(
+                RelationInfo(
+                    name=model_field.name,
+                    kind=_relation_kind(model_field),
+                    related_model=model_field.related_model._meta.label,
+                )
+            )
+        if not model_field.concrete:
+            continue
+        info.fields.append(
+            FieldInfo(
+                name=model_field.name,
+                type=model_field.get_internal_type(),
+                column=model_field.column,
+                null=model_field.null,
+                primary_key=model_field.primary_key,
+                unique=model_field.unique,
+                db_index=model_field.db_index,
+            )
+        )
+    for index in opts.indexes:
+        info.indexes.append((index.name or "", ", ".join(index.fields)))
+    for fields in opts.unique_together:
+        info.indexes.append(("unique together", ", ".join(fields)))
+    return info
+
+
+@lru_cache
+def get_schema() -> Dict[str, List[ModelInfo]]:
+    """
+    Return metadata of all installed models grouped by app label, cached for the session
+    """
+    schema = {}
+    for app_config in apps.get_app_configs():
+        models = [describe_model(model) for model in app_config.get_models()]
+        if models:
+            schema[app_config.label] = models
+    return schema
+
+
+def estimate_row_count(label: str) -> Optional[int]:
+    """
+    Return the row count estimate the database keeps in its catalog, None if unknown
+    """
+    model = apps.get_model(label)
+    alias = router.db_for_read(model)
+    connection = connections[alias]
+    sql = ROW_ESTIMATE_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        table = connection.ops.quote_name(table)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # e.g. sqlite_stat1 doesn't exist until ANALYZE runs
+        return None
+    if row is None or row[0] is None:
+        return None
+    if connection.vendor == "sqlite":
+        # The first number of the stat column is the number of rows
+        return int(str(row[0]).split()[0])
+    count = int(row[0])
+    # PostgreSQL reports -1 for tables that were never analyzed
+    return count if count >= 0 else None
+
+
+def count_rows(label: str, limit: int) -> int:
+    """
+    Count the rows of a model's table, stopping at limit
+    """
+    model = apps.get_model(label)
+    return model._base_manager.using(router.db_for_read(model)).order_by()[:limit].count()
+
+
+@lru_cache(maxsize=None)
+def describe_row_count(label: str) -> str:
+    """
+    Return the row count shown for a model: the catalog estimate where the database
+    keeps one, the row count of small tables otherwise. Cached for the session,
+    call describe_row_count.cache_clear() to refresh.
+    """
+    try:
+        count = estimate_row_count(label)
+        if count is not None:
+            return f"~{count:,}"
+        counted = count_rows(label, MAX_COUNTED_ROWS + 1)
+    except Exception as e:
+        return f"unknown ({type(e).__name__}: {e})"
+    if counted > MAX_COUNTED_ROWS:
+        return f"over {MAX_COUNTED_ROWS:,}, no catalog statistics (run ANALYZE for an estimate)"
+    return f"{counted:,}"
+
+
+class SchemaBrowserScreen(Screen):
+    selected_model: Optional[ModelInfo] = None
+
+    BINDINGS = [
+        Binding(key="ctrl+j", action="select_mode('commands')", description="Commands"),
+        Binding(key="ctrl+e", action="refresh_estimates", description="Refresh row estimates"),
+    ]
+
+    DEFAULT_CSS = """
+    SchemaBrowserScreen Tree {
+        dock: left;
+        width: 40;
+        background: $background 50%;
+    }
+
+    SchemaBrowserScreen DataTable {
+        height: auto;
+        max-height: 20;
+        margin-bottom: 1;
+    }
+
+    SchemaBrowserScreen Label {
+        padding: 0 1;
+    }
+    """
+
+    def compose(self) -> ComposeResult:
+        tree: Tree[ModelInfo] = Tree("Apps")
+        tree.root.expand()
+        for app_label, models in get_schema().items():
+            app_node = tree.root.add(app_label)
+            for model in models:
+                app_node.add_leaf(model.name, data=model)
+        yield tree
+        with VerticalScroll():
+            yield Static("Select a model", id="schema-title")
+            yield Label("Fields")
+            yield DataTable(id="schema-fields", zebra_stripes=True)
+            yield Label("Indexes")
+            yield DataTable(id="schema-indexes", zebra_stripes=True)
+            yield Label("Relations")
+            yield DataTable(id="schema-relations", zebra_stripes=True)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.query_one("#schema-fields", DataTable).add_columns(
+            "Name", "Type", "Column", "Null", "Primary key", "Unique", "Indexed"
+        )
+        self.query_one("#schema-indexes", DataTable).add_columns("Name", "Fields")
+        self.query_one("#schema-relations", DataTable).add_columns("Name", "Kind", "Related model")
+        self.query_one(Tree).focus()
+
+    @on(Tree.NodeHighlighted)
+    def show_model(self, event: Tree.NodeHighlighted[ModelInfo]) -> None:
+        model = event.node.data
+        if model is None:
+            return
+        self.selected_model = model
+        self._update_title(model, "estimating...")
+        fields = self.query_one("#schema-fields", DataTable)
+        fields.clear()
+        for model_field in model.fields:
+            fields.add_row(
+                model_field.name,
+                model_field.type,
+                model_field.column or "",
+                _yes(model_field.null),
+                _yes(model_field.primary_key),
+                _yes(model_field.unique),
+                _yes(model_field.db_index),
+            )
+        indexes = self.query_one("#schema-indexes", DataTable)
+        indexes.clear()
+        for name, index_fields in model.indexes:
+            indexes.add_row(name, index_fields)
+        relations = self.query_one("#schema-relations", DataTable)
+        relations.clear()
+        for relation in model.relations:
+            relations.add_row(relation.name, relation.kind, relation.related_model)
+        self._estimate(model)
+
+    def _update_title(self, model: ModelInfo, rows: str) -> None:
+        self.query_one("#schema-title", Static).update(
+            f"[b]{escape(model.label)}[/]  table: {escape(model.db_table)}  rows: {escape(rows)}"
+        )
+
+    @work(thread=True, exclusive=True)
+    def _estimate(self, model: ModelInfo) -> None:
+        try:
+            rows = describe_row_count(model.label)
+        finally:
+            connections.close_all()
+        self.app.call_from_thread(self._show_estimate, model, rows)
+
+    def _show_estimate(self, model: ModelInfo, rows: str) -> None:
+        if self.is_attached and self.selected_model is model:
+            self._update_title(model, rows)
+
+    def action_refresh_estimates(self) -> None:
+        describe_row_count.cache_clear()
+        if self.selected_model is not None:
+            self._estimate(self.selected_model)
+
+    def action_select_mode(self, mode_id: Literal["commands", "shell", "schema"]) -> None:
+        if mode_id == "commands":
+            from django_tui.management.commands.tui import DjangoCommandBuilder
+
+            self.app.push_screen(DjangoCommandBuilder("pyhton manage.py", "Test command name"))
+
+        elif mode_id == "shell":
+            from django_tui.management.commands.ish import InteractiveShellScreen
+
+            self.app.push_screen(InteractiveShellScreen("Interactive Shell"))
+
+        elif mode_id == "schema":
+            self.app.push_screen(SchemaBrowserScreen("Schema"))
+
+
+def _yes(value: bool) -> str:
+    return "yes" if value else ""
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import ast
+import inspect
+import math
+import os
+import statistics
+from dataclasses import dataclass
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Callable, Dict, List, MutableMapping, Optional
+
+from django.db import connections
+from django.db.models import QuerySet
+from rich.markup import escape
+from textual import on, work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Button, Input, Label, Static, Switch
+
+from django_tui.aio import get_async_runner
+from django_tui.capture import capture_stdout
+from django_tui.databases import use_database
+from django_tui.memo import statement_hash
+
+# Auto-ranging stops once a run takes at least this long, like timeit
+AUTORANGE_SECONDS = 0.2
+
+# Baseline key of the most recently saved baseline, to compare variants of a snippet
+LAST_BASELINE = "last"
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Return the percentile of values using linear interpolation between closest ranks
+    """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * percent / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@dataclass
+class TimingStats:
+    number: int
+    repeat: int
+    # Time of every single execution
+    timings: List[float]
+
+    @property
+    def min(self) -> float:
+        return min(self.timings)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.timings)
+
+    @property
+    def p95(self) -> float:
+        return percentile(self.timings, 95)
+
+    @property
+    def stddev(self) -> float:
+        return statistics.stdev(self.timings) if len(self.timings) > 1 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.number} loop(s) x {self.repeat} run(s)\n"
+            f"min {format_time(self.min)}  median {format_time(self.median)}  "
+            f"p95 {format_time(self.p95)}  stddev {format_time(self.stddev)}"
+        )
+
+    def compare(self, baseline: TimingStats, label: str = "Baseline") -> str:
+        ratio = baseline.median / self.median if self.median else math.inf
+        verdict = f"{ratio:.2f}x faster" if ratio >= 1 else f"{1 / ratio:.2f}x slower"
+        return f"{label} median {format_time(baseline.median)}, now {verdict}"
+
+
+@lru_cache
+def get_baselines() -> Dict[str, TimingStats]:
+    """
+    Return the session wide baselines, keyed on the normalized snippet hash
+    and LAST_BASELINE for the most recently saved one
+    """
+    return {}
+
+
+def snippet_key(code: str) -> str:
+    return statement_hash(ast.parse(code))
+
+
+def reset_query_caches(namespace: MutableMapping[str, Any]) -> None:
+    """
+    Replace the querysets in the namespace with unevaluated copies, so the next
+    evaluation hits the database again. The namespace is a shallow copy of the
+    shell's, so the shell's own querysets keep their results.
+    """
+    for name, value in namespace.items():
+        if isinstance(value, QuerySet):
+            namespace[name] = value._chain()
+
+
+def time_code(
+    code: str,
+    globals_: Dict[str, Any],
+    locals_: MutableMapping[str, Any],
+    number: int = 0,
+    repeat: int = 7,
+    warmup: bool = True,
+    query_cache: bool = True,
+) -> TimingStats:
+    """
+    Time every execution of code, number times per run (auto-ranged if 0) for repeat runs.
+    Without query_cache, querysets in the namespace are re-evaluated on every execution.
+    Output of the code is discarded.
+    """
+    if number < 0 or repeat < 1:
+        msg = "Loops can't be negative and there must be at least one run"
+        raise ValueError(msg)
+    compiled = compile(code, "<string>", "exec", flags=ast.PyCF_ALLOW_TOP_LEVEL_AWAIT)
+    if compiled.co_flags & inspect.CO_COROUTINE:
+        runner = get_async_runner()
+
+        def execute() -> None:
+            runner.run(eval(compiled, globals_, locals_))
+
+    else:
+
+        def execute() -> None:
+            exec(compiled, globals_, locals_)
+
+    def timed(loops: int) -> List[float]:
+        timings = []
+        for _ in range(loops):
+            if not query_cache:
+                reset_query_caches(locals_)
+            start = perf_counter()
+            execute()
+            timings.append(perf_counter() - start)
+        return timings
+
+    with open(os.devnull, "w") as devnull, capture_stdout(devnull):
+        if warmup:
+            timed(1)
+        if not number:
+            number = 1
+            while sum(timed(number)) < AUTORANGE_SECONDS:
+                number *= 10 if number < 1000 else 2
+        timings = []
+        for _ in range(repeat):
+            timings.extend(timed(number))
+    return TimingStats(number=number, repeat=repeat, timings=timings)
+
+
+class TimeitScreen(ModalScreen[None]):
+    BINDINGS = [
+        Binding("escape", "dismiss(None)", "Close"),
+    ]
+
+    DEFAULT_CSS = """
+    TimeitScreen {
+        align: center middle;
+    }
+
+    TimeitScreen > Vertical {
+        width: 80;
+        height: auto;
+        border: thick $primary 50%;
+        background: $surface;
+        padding: 1 2;
+    }
+
+    TimeitScreen Horizontal {
+        height: auto;
+    }
+
+    TimeitScreen Input {
+        width: 16;
+    }
+
+    TimeitScreen Label {
+        padding: 1 1;
+    }
+
+    #timeit-report {
+        height: auto;
+        padding: 1 0;
+    }
+"""
+
+    def __init__(
+        self,
+        code: str,
+        globals_: Dict[str, Any],
+        namespace_factory: Callable[[], MutableMapping[str, Any]],
+        alias: Optional[str] = None,
+        rollback: bool = False,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+    ):
+        self.code = code
+        self.globals_ = globals_
+        self.namespace_factory = namespace_factory
+        self.alias = alias
+        self.rollback = rollback
+        # Raises SyntaxError for code that can't be timed
+        self.key = snippet_key(code)
+        self.stats: Optional[TimingStats] = None
+        super().__init__(name, id, classes)
+
+    def compose(self) -> ComposeResult:
+        with Vertical():
+            yield Static(self.code.strip(), id="timeit-code", markup=False)
+            with Horizontal():
+                yield Label("Loops (0 = auto)")
+                yield Input("0", id="timeit-number", type="integer")
+                yield Label("Runs")
+                yield Input("7", id="timeit-repeat", type="integer")
+            with Horizontal():
+                yield Label("Warmup")
+                yield Switch(True, id="timeit-warmup")
+                yield Label("Query cache")
+                yield Switch(True, id="timeit-query-cache")
+            with Horizontal():
+                yield Button("Run", id="timeit-run", variant="primary")
+                yield Button("Save as baseline", id="timeit-baseline", disabled=True)
+            yield Static("", id="timeit-report")
+
+    @on(Button.Pressed, "#timeit-run")
+    def run_timeit(self) -> None:
+        try:
+            number = int(self.query_one("#timeit-number", Input).value or 0)
+            repeat = int(self.query_one("#timeit-repeat", Input).value or 1)
+        except ValueError:
+            number = repeat = -1
+        if number < 0 or repeat < 1:
+            self.query_one("#timeit-report", Static).update("[red]Loops must be 0 or more and runs 1 or more.[/]")
+            return
+        warmup = self.query_one("#timeit-warmup", Switch).value
+        query_cache = self.query_one("#timeit-query-cache", Switch).value
+        self.query_one("#timeit-report", Static).update("Timing...")
+        self.query_one("#timeit-run", Button).disabled = True
+        self._time_code(number, repeat, warmup, query_cache)
+
+    @work(thread=True, exclusive=True)
+    def _time_code(self, number: int, repeat: int, warmup: bool, query_cache: bool) -> None:
+        try:
+            with use_database(self.alias, rollback=self.rollback):
+                stats = time_code(
+                    self.code,
+                    self.globals_,
+                    self.namespace_factory(),
+                    number=number,
+                    repeat=repeat,
+                    warmup=warmup,
+                    query_cache=query_cache,
+                )
+        except Exception as e:
+            self.app.call_from_thread(self._show_error, e)
+        else:
+            self.app.call_from_thread(self._show_stats, stats)
+        finally:
+            connections.close_all()
+
+    def _show_error(self, error: Exception) -> None:
+        if not self.is_attached:
+            return
+        self.query_one("#timeit-run", Button).disabled = False
+        self.query_one("#timeit-report", Static).update(f"[red]{type(error).__name__}: {escape(str(error))}[/]")
+
+    def _show_stats(self, stats: TimingStats) -> None:
+        if not self.is_attached:
+            return
+        self.stats = stats
+        report = stats.summary()
+        baselines = get_baselines()
+        if self.key in baselines:
+            report += "\n" + stats.compare(baselines[self.key])
+        elif LAST_BASELINE in baselines:
+            report += "\n" + stats.compare(baselines[LAST_BASELINE], label="Last saved baseline")
+        self.query_one("#timeit-report", Static).update(report)
+        self.query_one("#timeit-run", Button).disabled = False
+        self.query_one("#timeit-baseline", Button).disabled = False
+
+    @on(Button.Pressed, "#timeit-baseline")
+    def save_baseline(self) -> None:
+        if self.stats is not None:
+            get_baselines()[self.key] = get_baselines()[LAST_BASELINE] = self.stats
+            self.notify("Saved as baseline for this snippet.")
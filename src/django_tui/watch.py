@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import importlib.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from django.apps import apps
+from django.core.management import get_commands
+
+from django_tui.migrations import fingerprint
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[]
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal ctypes binding of Linux inotify, watching directories for changed files
+    """
+
+    def __init__(self, dirs: Set[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches: Dict[int, str] = {}
+        for path in dirs:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = path
+
+    def read(self, timeout: float) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self.watches and name:
+                paths.add(os.path.join(self.watches[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Polling:
+    """
+    Fallback for platforms without inotify, compares modification times
+    """
+
+    def __init__(self, dirs: Set[str]):
+        self.dirs = dict.fromkeys(dirs, "")
+        self.files = fingerprint(self.dirs)
+
+    def read(self, timeout: float) -> Set[str]:
+        time.sleep(timeout)
+        current = fingerprint(self.dirs)
+        changed = {path for path in current.keys() | self.files.keys() if current.get(path) != self.files.get(path)}
+        self.files = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+@dataclass
+class WatchIndex:
+    """
+    What the watched files are: command modules by path and by directory (for
+    commands that don't exist yet), and modules that define models. Commands are
+    reloaded, changed models are only reported as they need a restart.
+    """
+
+    # path -> (command name, app name)
+    commands: Dict[str, Tuple[str, str]]
+    # commands directory -> app name
+    command_dirs: Dict[str, str]
+    # path -> module name
+    model_modules: Dict[str, str]
+
+    @property
+    def dirs(self) -> Set[str]:
+        return set(self.command_dirs) | {os.path.dirname(path) for path in self.model_modules}
+
+
+def _module_file(module_name: str) -> Optional[str]:
+    module = sys.modules.get(module_name)
+    path = getattr(module, "__file__", None)
+    if path is None:
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            return None
+        path = spec.origin if spec else None
+    return os.path.abspath(path) if path and path.endswith(".py") else None
+
+
+def build_index() -> WatchIndex:
+    commands = {}
+    command_dirs = {}
+    for name, app_name in get_commands().items():
+        path = _module_file(f"{app_name}.management.commands.{name}")
+        if path is not None:
+            commands[path] = (name, app_name)
+            command_dirs[os.path.dirname(path)] = app_name
+    model_modules = {}
+    for model in apps.get_models():
+        path = _module_file(model.__module__)
+        if path is not None:
+            model_modules[path] = model.__module__
+    return WatchIndex(commands=commands, command_dirs=command_dirs, model_modules=model_modules)
+
+
+class FileWatcher(threading.Thread):
+    """
+    Watch command and model modules and call back with the set of changed files.
+    Bursts of events, e.g. an editor's write and rename, are reported together.
+    """
+
+    debounce = 0.2
+
+    def __init__(self, index: WatchIndex, callback: Callable[[Set[str]], None]):
+        super().__init__(name="django-tui-watch", daemon=True)
+        self.index = index
+        self.callback = callback
+        self.stopped = threading.Event()
+        try:
+            self.backend = Inotify(index.dirs)
+        except (AttributeError, OSError):
+            # No inotify outside of Linux
+            self.backend = Polling(index.dirs)
+
+    def run(self) -> None:
+        try:
+            while not self.stopped.is_set():
+                changed = self.backend.read(1.0)
+                if not changed:
+                    continue
+                changed |= self.backend.read(self.debounce)
+                changed = {path for path in changed if path.endswith(".py")}
+                if changed:
+                    self.callback(changed)
+        finally:
+            self.backend.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import django
+import pytest
+from django.test.utils import setup_databases, teardown_databases
+
+
+@pytest.fixture(scope="session")
+def testapp():
+    """
+    Set up the project in tests/testapp with a fresh test database, for tests
+    that drive the real app
+    """
+    sys.path.insert(0, os.path.dirname(__file__))
+    os.environ["DJANGO_SETTINGS_MODULE"] = "testapp.settings"
+    django.setup()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(old_config, verbosity=0)
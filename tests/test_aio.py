@@ -0,0 +1,18 @@
+from django_tui.aio import exec_code
+
+
+def test_exec_code_top_level_await():
+    local_scope = {"gen": _gen}
+    exec_code("import asyncio\nawait asyncio.sleep(0)\ny = [i async for i in gen()]", {}, local_scope)
+    assert local_scope["y"] == [0, 1, 2]
+
+
+def test_exec_code_sync():
+    local_scope = {}
+    exec_code("x = 1 + 1", {}, local_scope)
+    assert local_scope["x"] == 2
+
+
+async def _gen():
+    for i in range(3):
+        yield i
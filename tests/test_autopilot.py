@@ -0,0 +1,51 @@
+import asyncio
+import os
+
+import pytest
+from textual import events
+
+from django_tui.autopilot import Recorder, ReplayReport, Script, StepTiming, replay
+from django_tui.diff import get_output_history
+from django_tui.management.commands.tui import DjangoTui
+
+SCRIPTS = os.path.join(os.path.dirname(__file__), "autopilot")
+
+
+def key(name, character=None):
+    return events.Key(name, character)
+
+
+def test_recorder_groups_typing():
+    recorder = Recorder(size=(80, 24))
+    for event in [key("down"), key("p", "p"), key("left_parenthesis", "("), key("enter", "\r"), key("ctrl+r")]:
+        recorder.record(event)
+    steps = recorder.script.steps
+    assert [step.keys for step in steps] == [["down"], ["p", "left_parenthesis"], ["enter"], ["ctrl+r"]]
+    assert steps[1].label == "p("
+
+
+def test_script_round_trip(tmp_path):
+    path = str(tmp_path / "script.json")
+    recorder = Recorder(size=(100, 30), open_shell=True)
+    recorder.record(key("ctrl+r"))
+    recorder.script.save(path)
+    assert Script.load(path) == recorder.script
+
+
+def test_over_budget():
+    report = ReplayReport(StepTiming("startup", 0.5, 3), [StepTiming("down", 0.01, 1), StepTiming("ctrl+r", 2.0, 4)])
+    assert [step.label for step in report.over_budget(1.0)] == ["ctrl+r"]
+    assert "ctrl+r" in report.summary()
+
+
+@pytest.mark.usefixtures("testapp")
+def test_replay_shell():
+    # The editor closes the parenthesis itself, like in a recording
+    script = Script.load(os.path.join(SCRIPTS, "shell.json"))
+    app = DjangoTui(open_shell=script.shell)
+    report = asyncio.run(replay(app, script))
+    assert [step.label for step in report.steps] == ["print(42", "ctrl+r"]
+    assert all(step.repaints for step in report.steps)
+    # Generous, this catches steps that hang rather than slow machines
+    assert not report.over_budget(10.0)
+    assert get_output_history().get(0).out.strip() == "42"
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from django_tui import clipboard
+from django_tui.clipboard import OSC52_LIMIT, ClipboardService, osc52_size
+
+
+class FakeApp:
+    def __init__(self):
+        self.copied = []
+        self.messages = []
+        self.notified = threading.Event()
+
+    def copy_to_clipboard(self, text):
+        self.copied.append(text)
+
+    def notify(self, message, severity="information"):
+        self.messages.append((message, severity))
+        self.notified.set()
+
+    def call_from_thread(self, callback, *args, **kwargs):
+        callback(*args, **kwargs)
+
+
+@pytest.fixture
+def piped(monkeypatch):
+    inputs = []
+    monkeypatch.setattr(clipboard, "run", lambda _command, **kwargs: inputs.append(kwargs["input"]))
+    return inputs
+
+
+def test_osc52_size_counts_encoded_bytes():
+    assert osc52_size("abc") == 4
+    # Two bytes each in UTF-8
+    assert osc52_size("éé") == 8
+
+
+def test_small_text_goes_through_the_terminal(piped):
+    app = FakeApp()
+    ClipboardService(app, mode="osc52").copy("hello", "Copied.")
+    assert app.copied == ["hello"]
+    assert app.messages == [("Copied.", "information")]
+    assert piped == []
+
+
+def test_large_text_goes_through_the_command(piped):
+    # Short enough as characters, too large once encoded
+    text = "é" * (OSC52_LIMIT * 3 // 4 - 10)
+    app = FakeApp()
+    service = ClipboardService(app, mode="osc52")
+    service.command = ["xclip"]
+    service.copy(text, "Copied.")
+    assert app.notified.wait(5)
+    assert app.copied == []
+    assert piped == [text]
+    assert app.messages == [("Copied.", "information")]
+
+
+def test_large_text_without_a_command(piped):
+    text = "x" * OSC52_LIMIT
+    app = FakeApp()
+    service = ClipboardService(app, mode="osc52")
+    service.command = None
+    service.copy(text, "Copied.")
+    assert app.copied == [text]
+    assert app.messages[0][1] == "warning"
+    assert piped == []
+
+
+def test_command_mode_without_a_command(piped):
+    app = FakeApp()
+    service = ClipboardService(app, mode="command")
+    service.command = None
+    service.copy("hello", "Copied.")
+    assert app.copied == []
+    assert app.messages[0][1] == "error"
+    assert piped == []
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connections, router
+
+from django_tui.databases import AliasRouter, ensure_usable, use_database
+
+pytestmark = pytest.mark.usefixtures("testapp")
+
+
+def test_use_database_routes_queries():
+    from django.contrib.auth.models import User
+
+    with use_database("default"):
+        alias_router = router.routers[0]
+        assert isinstance(alias_router, AliasRouter)
+        assert alias_router.db_for_read(User) == alias_router.db_for_write(User) == "default"
+    # Outside, the routers configured in settings decide
+    assert alias_router.db_for_read(User) is None
+    assert router.db_for_read(User) == "default"
+
+
+def test_use_database_rollback():
+    from django.contrib.auth.models import User
+
+    with use_database("default", rollback=True):
+        User.objects.create(username="rolled-back")
+        assert User.objects.filter(username="rolled-back").exists()
+    assert not User.objects.filter(username="rolled-back").exists()
+
+    with use_database(rollback=True):
+        User.objects.create(username="rolled-back")
+    assert not User.objects.filter(username="rolled-back").exists()
+
+    with use_database("default"):
+        User.objects.create(username="kept")
+    assert User.objects.filter(username="kept").exists()
+    User.objects.filter(username="kept").delete()
+
+
+def test_ensure_usable_keeps_working_connections():
+    connection = connections["default"]
+    connection.ensure_connection()
+    raw = connection.connection
+    ensure_usable("default")
+    assert connection.connection is raw
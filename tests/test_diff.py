@@ -0,0 +1,42 @@
+import difflib
+
+from django_tui.diff import OutputHistory, diff_lines, unified_diff
+
+
+def test_diff_lines():
+    a = ["a", "b", "c", "a", "b", "b", "a"]
+    b = ["c", "b", "a", "b", "a", "c"]
+    opcodes = diff_lines(a, b)
+    assert sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal") == 4
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            rebuilt.extend(a[i1:i2])
+        elif tag == "insert":
+            rebuilt.extend(b[j1:j2])
+    assert rebuilt == b
+
+
+def test_unified_diff_matches_difflib():
+    a = [f"line {i}" for i in range(20)]
+    b = list(a)
+    b[5] = "changed"
+    b.insert(15, "new")
+    expected = list(difflib.unified_diff(a, b, lineterm=""))[2:]
+    assert list(unified_diff(a, b, diff_lines(a, b))) == expected
+
+
+def test_too_many_edits():
+    opcodes = diff_lines(["a", "b", "c"], ["x", "y", "z"], max_edits=2)
+    assert [tag for tag, *_ in opcodes] == ["delete", "insert"]
+
+
+def test_output_history_is_bounded():
+    history = OutputHistory(max_entries=3, max_chars=10)
+    for out in ["1234", "5678", "9012"]:
+        history.append("print()", out)
+    assert len(history) == 2
+    assert history.get(0).out == "9012"
+    assert history.get(1).out == "5678"
+    assert history.get(2) is None
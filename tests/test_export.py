@@ -0,0 +1,113 @@
+import asyncio
+import datetime as dt
+import json
+
+import pytest
+from django.db.models.functions import Length
+from textual.app import App
+from textual.widgets import Button, Input
+
+from django_tui.export import CsvWriter, ExportScreen, NdjsonWriter, export_queryset, iter_chunks
+
+pytestmark = pytest.mark.usefixtures("testapp")
+
+
+def test_csv_writer(tmp_path):
+    path = str(tmp_path / "rows.csv")
+    writer = CsvWriter(path, ["id", "name"])
+    writer.write([{"id": 1, "name": "a"}, {"id": 2, "name": "b, c"}])
+    writer.close()
+    assert open(path).read().splitlines() == ["id,name", "1,a", '2,"b, c"']
+
+
+def test_ndjson_writer(tmp_path):
+    path = str(tmp_path / "rows.ndjson")
+    writer = NdjsonWriter(path, ["id", "day"])
+    writer.write([{"id": 1, "day": dt.date(2024, 1, 2)}])
+    writer.write([{"id": 2, "day": None}])
+    writer.close()
+    rows = [json.loads(line) for line in open(path)]
+    assert rows == [{"id": 1, "day": "2024-01-02"}, {"id": 2, "day": None}]
+
+
+@pytest.fixture
+def users():
+    from django.contrib.auth.models import User
+
+    User.objects.bulk_create([User(username=f"user{i}", is_staff=i % 2 == 0) for i in range(5)])
+    yield User.objects.order_by("id")
+    User.objects.all().delete()
+
+
+def test_iter_chunks(users):
+    chunks = list(iter_chunks(users, 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0][0]["username"] == "user0"
+    assert "password" in chunks[0][0]
+
+
+def test_iter_chunks_values_list(users):
+    rows = [row for chunk in iter_chunks(users.values_list("username", "is_staff"), 10) for row in chunk]
+    assert rows[:2] == [{"username": "user0", "is_staff": True}, {"username": "user1", "is_staff": False}]
+    rows = [row for chunk in iter_chunks(users.values_list("username", flat=True), 10) for row in chunk]
+    assert rows[0] == {"username": "user0"}
+
+
+def test_export_csv(users, tmp_path):
+    path = str(tmp_path / "users.csv")
+    progress = []
+    result = export_queryset(
+        users.values("username").annotate(name_length=Length("username")),
+        path,
+        chunk_size=2,
+        progress=lambda rows, total, _size: progress.append((rows, total)),
+    )
+    assert result.rows == 5
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+    lines = open(path).read().splitlines()
+    assert lines[:2] == ["username,name_length", "user0,5"]
+    assert len(lines) == 6
+
+
+def test_export_ndjson(users, tmp_path):
+    path = str(tmp_path / "users.ndjson")
+    export_queryset(users, path, "ndjson")
+    rows = [json.loads(line) for line in open(path)]
+    assert [row["username"] for row in rows] == [f"user{i}" for i in range(5)]
+    assert rows[0]["last_login"] is None
+
+
+def test_export_empty(users, tmp_path):
+    path = str(tmp_path / "users.csv")
+    result = export_queryset(users.filter(username="nobody").values("id", "username"), path)
+    assert result.rows == 0
+    assert open(path).read().splitlines() == ["id,username"]
+
+
+def test_export_parquet_types_from_fields(users, tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "users.parquet")
+    export_queryset(users, path, "parquet", chunk_size=2)
+    table = parquet.read_table(path)
+    assert table.num_rows == 5
+    # Never set, but typed by its field instead of as null
+    assert str(table.schema.field("last_login").type).startswith("timestamp")
+    assert str(table.schema.field("is_staff").type) == "bool"
+
+
+def test_export_screen_rejects_a_partial_chunk_size(users, monkeypatch):
+    messages = []
+
+    async def run():
+        app = App()
+        async with app.run_test() as pilot:
+            screen = ExportScreen(users)
+            await app.push_screen(screen)
+            await pilot.pause()
+            monkeypatch.setattr(screen, "notify", lambda message, **_kwargs: messages.append(message))
+            screen.query_one("#export-chunk-size", Input).value = "-"
+            screen.start_export()
+            return screen.query_one("#export-start", Button).disabled
+
+    assert not asyncio.run(run())
+    assert messages == ["The chunk size must be a whole number."]
@@ -0,0 +1,61 @@
+import sys
+import threading
+from io import StringIO
+
+import pytest
+
+from django_tui.capture import capture_stdout, install_stdout
+from django_tui.fanout import fan_out
+
+pytestmark = pytest.mark.usefixtures("testapp")
+
+
+def test_fan_out():
+    from django.contrib.auth.models import User
+
+    scope = {"User": User, "x": 1}
+    code = "x += 1\nprint(x, User.objects.count())"
+    results = fan_out(code, ["default", "default"], {}, lambda: dict(scope))
+    assert [(result.alias, result.status, result.out) for result in results] == [
+        ("default", "success", "2 0\n"),
+        ("default", "success", "2 0\n"),
+    ]
+    # Every alias got its own copy of the namespace
+    assert scope["x"] == 1
+
+    [result] = fan_out("print(missing)", ["default"], {}, dict)
+    assert result.status == "error"
+    assert "NameError" in result.out
+
+
+def test_fan_out_rollback():
+    from django.contrib.auth.models import User
+
+    code = "User.objects.create(username='fanned-out')"
+    [result] = fan_out(code, ["default"], {}, lambda: {"User": User}, rollback=True)
+    assert result.status == "success"
+    assert not User.objects.filter(username="fanned-out").exists()
+
+
+def test_capture_stdout_is_per_thread():
+    install_stdout()
+    captured, started, done = StringIO(), threading.Event(), threading.Event()
+
+    def run():
+        with capture_stdout(captured):
+            print("captured")
+            started.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait(5)
+    stream, sys.stdout.stream = sys.stdout.stream, StringIO()
+    try:
+        print("elsewhere")
+        assert sys.stdout.stream.getvalue() == "elsewhere\n"
+    finally:
+        sys.stdout.stream = stream
+        done.set()
+        thread.join()
+    assert captured.getvalue() == "captured\n"
@@ -0,0 +1,46 @@
+import sys
+from gettext import gettext
+
+from django_tui.management.commands.ish import LastValue, bind_last_value, child_count, deep_size, iter_children
+
+
+def test_bind_last_value():
+    namespace = {}
+    exec(compile(bind_last_value("x = 20\nx + 1"), "<input>", "exec"), {}, namespace)
+    assert namespace["_"] == 21
+    namespace = {}
+    exec(compile(bind_last_value("print('hi')"), "<input>", "exec"), {}, namespace)
+    assert "_" not in namespace
+    namespace = {}
+    exec(compile(bind_last_value("from gettext import gettext as _\n1 + 1"), "<input>", "exec"), {}, namespace)
+    assert namespace["_"] is gettext
+
+
+def test_last_value_keeps_user_underscore():
+    scope = {}
+    last_value = LastValue()
+    assert last_value.is_free(scope)
+    scope["_"] = 21
+    last_value.remember(scope)
+    assert last_value.is_bound(scope)
+    scope["_"] = gettext
+    assert not last_value.is_free(scope)
+
+
+def test_children():
+    value = {"a": [1, 2], "b": "text"}
+    assert child_count(value) == 2
+    assert child_count("text") is None
+    assert [label for label, _ in iter_children(value)] == ["'a'", "'b'"]
+    assert [label for label, _ in iter_children([1, 2])] == ["[0]", "[1]"]
+
+
+def test_deep_size():
+    strings = [str(i) * 100 for i in range(10)]
+    size, exact = deep_size(strings)
+    assert exact
+    assert size == sys.getsizeof(strings) + sum(sys.getsizeof(s) for s in strings)
+
+    size, exact = deep_size(["x" * 100 + str(i) for i in range(1000)], sample=10)
+    assert not exact
+    assert size > 1000 * 100
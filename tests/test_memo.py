@@ -0,0 +1,88 @@
+import ast
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+from django_tui.memo import ResultCache, fingerprint, is_read_only
+
+
+def test_is_read_only():
+    namespace = {"items": [1, 2]}
+    assert is_read_only(ast.parse("print(len(items))").body[0], namespace)
+    assert not is_read_only(ast.parse("obj.name = 'x'").body[0], namespace)
+    assert not is_read_only(ast.parse("import os").body[0], namespace)
+    # Only calls known to be pure qualify
+    assert not is_read_only(ast.parse("x = load()").body[0], namespace)
+    assert not is_read_only(ast.parse("x = items.pop()").body[0], namespace)
+
+
+@pytest.mark.usefixtures("testapp")
+def test_is_read_only_queryset_methods():
+    from django.contrib.auth.models import User
+
+    namespace = {"User": User, "users": User.objects.all(), "cache": {}, "requests": ast}
+    assert is_read_only(ast.parse("x = User.objects.filter(a=1).count()").body[0], namespace)
+    assert is_read_only(ast.parse("users.exclude(a=1).values('id').first()").body[0], namespace)
+    assert not is_read_only(ast.parse("User.objects.filter(a=1).update(a=2)").body[0], namespace)
+    # Only on querysets, names of queryset methods on anything else aren't pure
+    assert not is_read_only(ast.parse("cache.get('key')").body[0], namespace)
+    assert not is_read_only(ast.parse("requests.get(url)").body[0], namespace)
+    assert not is_read_only(ast.parse("Unknown.objects.count()").body[0], namespace)
+    assert not is_read_only(ast.parse("users.first().get()").body[0], namespace)
+    assert not is_read_only(ast.parse("it = users.iterator()").body[0], namespace)
+
+
+def test_fingerprint():
+    assert fingerprint([1, {"a": (2, 3)}]) == fingerprint([1, {"a": (2, 3)}])
+    assert fingerprint([1, 2]) != fingerprint([1, 2, 3])
+    assert fingerprint(iter([1])) is None
+    assert fingerprint([object()]) is None
+
+
+def test_cache_serves_read_only_statements():
+    namespace = {"items": [1, 2]}
+    cache = ResultCache()
+    code = "x = len(items)\nprint(x)\n"
+
+    first = StringIO()
+    with redirect_stdout(first):
+        assert cache.execute(code, {}, namespace, first) == []
+    second = StringIO()
+    with redirect_stdout(second):
+        assert cache.execute(code, {}, namespace, second) == [1, 2]
+    assert first.getvalue() == second.getvalue() == "2\n"
+
+    # Inputs are fingerprinted by content, a list changed in place is a new input
+    namespace["items"].append(3)
+    third = StringIO()
+    with redirect_stdout(third):
+        assert cache.execute(code, {}, namespace, third) == []
+    assert third.getvalue() == "3\n"
+
+
+def test_cache_cleared_by_side_effects():
+    cache = ResultCache()
+    namespace = {"items": [1, 2]}
+    cache.execute("x = len(items)\n", {}, namespace, StringIO())
+    assert len(cache) == 1
+    cache.execute("import os\n", {}, namespace, StringIO())
+    assert len(cache) == 0
+
+
+def test_cache_skips_iterators():
+    cache = ResultCache()
+    namespace = {"items": [1, 2]}
+    cache.execute("pairs = zip(items, items)\n", {}, namespace, StringIO())
+    assert len(cache) == 0
+
+
+def test_cache_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.execute("a = 1\nb = 2\nc = 3\n", {}, {}, StringIO())
+    assert len(cache) == 2
+
+    cache = ResultCache(ttl=-1)
+    namespace = {}
+    cache.execute("a = 1\n", {}, namespace, StringIO())
+    assert cache.execute("a = 1\n", {}, namespace, StringIO()) == []
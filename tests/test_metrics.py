@@ -0,0 +1,35 @@
+import time
+import tracemalloc
+
+from django_tui.metrics import RunMetrics, format_bytes, measure
+
+
+def test_measure():
+    with measure() as metrics:
+        sum(range(200_000))
+        time.sleep(0.01)
+    assert metrics.wall >= 0.01
+    assert 0 < metrics.cpu < metrics.wall + 1
+    assert metrics.traced_peak is None
+    assert metrics.top_allocations == []
+    assert "ms wall" in metrics.summary()
+
+
+def test_measure_traces_allocations():
+    with measure(trace_allocations=True, top=3) as metrics:
+        data = [bytearray(1024) for _ in range(1000)]
+    assert metrics.traced_peak >= 1024 * 1000
+    assert 0 < len(metrics.top_allocations) <= 3
+    location, size, count = metrics.top_allocations[0]
+    assert "test_metrics.py" in location
+    assert size >= 1024 * 1000
+    assert count >= 1000
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_format_bytes():
+    assert format_bytes(None) == "n/a"
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KiB"
+    assert RunMetrics(wall=0.5, cpu=0.25).cpu_ratio == 0.5
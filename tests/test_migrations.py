@@ -0,0 +1,30 @@
+import pytest
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+
+from django_tui.migrations import MigrationCache
+
+pytestmark = pytest.mark.usefixtures("testapp")
+
+
+def test_refresh_is_cached():
+    cache = MigrationCache()
+    state, changed = cache.refresh()
+    assert changed
+    assert state.unapplied == {"default": []}
+    assert state.errors == {}
+    assert state.leaf_nodes["sessions"] == ["0001_initial"]
+    assert state.total > 0
+
+    assert cache.refresh() == (state, False)
+    assert cache.refresh(reload_applied=True)[1]
+
+
+def test_unapplied_migrations():
+    recorder = MigrationRecorder(connection)
+    recorder.record_unapplied("sessions", "0001_initial")
+    try:
+        state, _ = MigrationCache().refresh()
+        assert state.unapplied["default"] == [("sessions", "0001_initial")]
+    finally:
+        recorder.record_applied("sessions", "0001_initial")
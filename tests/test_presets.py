@@ -0,0 +1,81 @@
+import asyncio
+
+import click
+import pytest
+from trogon.introspect import ArgumentSchema, MultiValueParamData, OptionSchema
+from trogon.run_command import UserArgumentData, UserCommandData, UserOptionData
+from trogon.widgets.parameter_controls import ValueNotSupplied
+
+from django_tui.presets import MAX_RECENT, Invocation, PresetStore, invocation_from_command_data
+
+
+def test_invocation_from_command_data():
+    exclude = OptionSchema(name="--exclude", type=click.STRING, default=MultiValueParamData([]), multiple=True)
+    indent = OptionSchema(name="--indent", type=click.INT, default=MultiValueParamData([]))
+    label = ArgumentSchema(name="app_label", type=click.STRING, default=MultiValueParamData([]))
+    command = UserCommandData(
+        name="dumpdata",
+        options=[
+            UserOptionData("--exclude", ("auth",), exclude),
+            UserOptionData("--exclude", ("contenttypes",), exclude),
+            UserOptionData("--indent", (ValueNotSupplied(),), indent),
+        ],
+        arguments=[UserArgumentData("app_label", ("testapp",), label)],
+    )
+    root = UserCommandData(name="django", subcommand=command)
+
+    invocation = invocation_from_command_data(root)
+
+    assert invocation.command == "dumpdata"
+    assert invocation.args == ["dumpdata", "--exclude", "auth", "--exclude", "contenttypes", "testapp"]
+    assert invocation.values == {"--exclude": [["auth"], ["contenttypes"]], "app_label": [["testapp"]]}
+
+
+def test_store_roundtrip(tmp_path):
+    path = str(tmp_path / "presets.json")
+    store = PresetStore(path)
+    store.save_preset("dump", Invocation(command="dumpdata", args=["dumpdata", "--indent", "2"]))
+    for i in range(MAX_RECENT + 2):
+        store.record(Invocation(command="check", args=["check", str(i)]))
+    store.record(Invocation(command="check", args=["check", "3"]))
+
+    loaded = PresetStore(path)
+    assert loaded.presets_for("dumpdata")["dump"].args == ["dumpdata", "--indent", "2"]
+    assert loaded.presets_for("check") == {}
+    recent = [item.args[1] for item in loaded.recent["check"]]
+    assert len(recent) == MAX_RECENT
+    assert recent[:2] == ["3", str(MAX_RECENT + 1)]
+    assert recent.count("3") == 1
+
+
+def test_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "presets.json"
+    path.write_text('{"presets": {"half')
+    with pytest.warns(RuntimeWarning):
+        store = PresetStore(str(path))
+    assert store.presets == {}
+    assert store.recent == {}
+
+
+@pytest.mark.usefixtures("testapp")
+def test_close_and_run_when_the_store_is_not_writable(monkeypatch, capsys):
+    from django_tui.management.commands import tui
+
+    class ReadOnlyStore:
+        def record(self, invocation):
+            msg = f"Read-only file system: {invocation.command}"
+            raise OSError(msg)
+
+    monkeypatch.setattr(tui, "get_preset_store", ReadOnlyStore)
+
+    async def run():
+        app = tui.DjangoTui()
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            app.screen.command_data = UserCommandData(name="django", subcommand=UserCommandData(name="check"))
+            app.screen.action_close_and_run()
+        return app
+
+    app = asyncio.run(run())
+    assert app.execute_on_exit
+    assert "Could not save the invocation to the presets file: Read-only file system: check" in capsys.readouterr().err
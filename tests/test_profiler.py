@@ -0,0 +1,46 @@
+import json
+import pstats
+
+import pytest
+
+from django_tui.aio import exec_code
+from django_tui.profiler import CProfileProfiler, SamplingProfiler, export_dir
+
+pytestmark = pytest.mark.skipif(not SamplingProfiler.available(), reason="needs SIGPROF on the main thread")
+
+BUSY = "def busy():\n    return sum(i * i for i in range(2_000_000))\n"
+
+
+def profiled_functions(profiler):
+    return {key[2] for key in profiler.result().stats}
+
+
+def test_sampling_profiler():
+    with SamplingProfiler() as profiler:
+        exec_code(BUSY + "busy()", {}, {})
+    result = profiler.result()
+    assert result.root.value > 0
+    assert {"<module>", "busy"} <= profiled_functions(profiler)
+
+
+def test_sampling_profiler_async():
+    # Top level await runs on the shell's event loop thread, not the main thread
+    with SamplingProfiler() as profiler:
+        exec_code("async " + BUSY + "await busy()", {}, {})
+    assert "busy" in profiled_functions(profiler)
+
+
+def test_export(tmp_path, monkeypatch):
+    monkeypatch.setenv("DJANGO_TUI_PROFILE_DIR", str(tmp_path / "profiles"))
+    with CProfileProfiler() as profiler:
+        exec_code(BUSY + "busy()", {}, {})
+    result = profiler.result()
+    assert "busy" in profiled_functions(profiler)
+
+    path = f"{export_dir()}/profile.pstats"
+    result.export_pstats(path)
+    assert any(key[2] == "busy" for key in pstats.Stats(path).stats)
+    path = f"{export_dir()}/profile.speedscope.json"
+    result.export_speedscope(path)
+    with open(path) as f:
+        assert json.load(f)["profiles"][0]["samples"]
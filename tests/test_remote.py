@@ -0,0 +1,129 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from io import BytesIO
+
+import pytest
+
+from django_tui.metrics import RunMetrics
+from django_tui.remote import (
+    AgentServer,
+    RemoteExecutor,
+    StreamedOutput,
+    encode,
+    message_to_result,
+    result_to_message,
+    serve,
+    start_agent,
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets only")
+
+
+def test_result_roundtrip():
+    metrics = RunMetrics(wall=0.5, cpu=0.25, top_allocations=[("<string>:1", 1024, 2)])
+    result = {"code": "print(1)", "out": "1\n", "status": "success", "cached": [], "metrics": metrics}
+    message = json.loads(encode(result_to_message(result)))
+    assert message_to_result(message) == result
+
+
+def test_serve_reports_errors():
+    rfile = BytesIO(encode({"id": 1, "op": "nope"}) + b"not json\n")
+    wfile = BytesIO()
+    serve(rfile, wfile)
+    first, second = [json.loads(line) for line in wfile.getvalue().splitlines()]
+    assert first == {"id": 1, "error": "Unknown operation 'nope'"}
+    assert second["id"] is None
+    assert second["error"].startswith("JSONDecodeError")
+
+
+def test_streamed_output_flushes_on_a_timer():
+    messages = []
+    output = StreamedOutput(messages.append, 1, interval=0.01)
+    output("a")
+    output("b")
+    deadline = time.monotonic() + 5
+    while not messages and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert messages == [{"id": 1, "output": "ab"}]
+    output("c")
+    output.flush()
+    assert messages[1:] == [{"id": 1, "output": "c"}]
+    assert output.timer is None
+
+
+@pytest.mark.usefixtures("testapp")
+def test_agent_round_trip(tmp_path):
+    path = str(tmp_path / "agent.sock")
+    server = start_agent(path)
+    try:
+        executor = RemoteExecutor(path)
+        try:
+            assert executor.info["pid"] == os.getpid()
+            streamed = []
+            code = "from django.contrib.auth.models import User\nprint(User.objects.count())"
+            result = executor.run(code, output=streamed.append)
+            assert result["status"] == "success"
+            assert result["out"] == "".join(streamed) == "0\n"
+            assert result["metrics"].wall > 0
+            assert "NameError" in executor.run("print(missing)")["out"]
+        finally:
+            executor.close()
+        with pytest.raises(RuntimeError, match="Another agent"):
+            AgentServer(path)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not os.path.exists(path)
+
+
+def test_stale_socket(tmp_path):
+    path = str(tmp_path / "agent.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(path)
+    server = AgentServer(path)
+    server.server_close()
+
+    with open(path, "w") as f:
+        f.write("not a socket")
+    with pytest.raises(RuntimeError, match="not a socket"):
+        AgentServer(path)
+    assert os.path.exists(path)
+
+
+def test_sockets_of_other_users_are_refused(tmp_path, monkeypatch):
+    path = str(tmp_path / "agent.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(path)
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+
+    with pytest.raises(RuntimeError, match="owned by another user"):
+        RemoteExecutor(path)
+    with pytest.raises(RuntimeError, match="owned by another user"):
+        AgentServer(path)
+    assert os.path.exists(path)
+
+
+@pytest.mark.usefixtures("testapp")
+def test_runs_capture_only_their_own_output():
+    from django_tui.management.commands.ish import run_code
+
+    stop = threading.Event()
+
+    def chatter():
+        while not stop.is_set():
+            sys.stdout.write("chatter\n")
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=chatter)
+    thread.start()
+    try:
+        result = run_code("import time\nfor i in range(3):\n    print(i)\n    time.sleep(0.01)")
+    finally:
+        stop.set()
+        thread.join()
+    assert result["out"] == "0\n1\n2\n"
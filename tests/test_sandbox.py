@@ -0,0 +1,35 @@
+import signal
+
+import pytest
+
+from django_tui.sandbox import SandboxExecutor, SandboxKilledError, exit_reason
+
+pytest.importorskip("resource")
+
+
+def test_exit_reason():
+    assert "CPU time" in exit_reason(-signal.SIGXCPU, 5)
+    assert "out of memory" in exit_reason(-signal.SIGKILL, 5)
+    assert exit_reason(3, 5) == "it exited with status 3"
+
+
+@pytest.mark.usefixtures("testapp")
+def test_sandbox_restarts_after_being_killed():
+    executor = SandboxExecutor(memory=1024, cpu=2)
+    try:
+        streamed = []
+        result = executor.run("x = 1\nprint(x)", output=streamed.append)
+        assert result["out"] == "1\n"
+        assert "".join(streamed) == "1\n"
+
+        result = executor.run("data = bytearray(2 * 1024**3)")
+        assert result["status"] == "error"
+        assert "MemoryError" in result["out"]
+
+        pid = executor.info["pid"]
+        with pytest.raises(SandboxKilledError, match="CPU time"):
+            executor.run("while True: pass")
+        assert executor.info["pid"] != pid
+        assert "NameError" in executor.run("print(x)")["out"]
+    finally:
+        executor.close()
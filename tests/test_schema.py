@@ -0,0 +1,37 @@
+import pytest
+from django.db import connection
+
+from django_tui import schema
+from django_tui.schema import describe_row_count, estimate_row_count
+
+pytestmark = pytest.mark.usefixtures("testapp")
+
+
+@pytest.fixture
+def groups():
+    from django.contrib.auth.models import Group
+
+    Group.objects.bulk_create([Group(name=f"group{i}") for i in range(5)])
+    describe_row_count.cache_clear()
+    yield
+    Group.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    describe_row_count.cache_clear()
+
+
+def test_row_count_without_statistics_is_counted(groups):
+    assert estimate_row_count("auth.Group") is None
+    assert describe_row_count("auth.Group") == "5"
+
+
+def test_row_count_over_the_counting_limit(groups, monkeypatch):
+    monkeypatch.setattr(schema, "MAX_COUNTED_ROWS", 3)
+    assert describe_row_count("auth.Group").startswith("over 3, no catalog statistics")
+
+
+def test_row_count_from_statistics(groups):
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    assert estimate_row_count("auth.Group") == 5
+    assert describe_row_count("auth.Group") == "~5"
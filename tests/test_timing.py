@@ -0,0 +1,32 @@
+import pytest
+
+from django_tui.timing import TimingStats, percentile, time_code
+
+
+def test_percentile():
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2], 95) == 1.95
+
+
+def test_time_code():
+    namespace = {"calls": []}
+    stats = time_code("calls.append(1)", {}, namespace, number=3, repeat=2, warmup=True)
+    assert len(stats.timings) == 6
+    assert len(namespace["calls"]) == 7
+
+
+def test_compare():
+    baseline = TimingStats(number=1, repeat=2, timings=[2.0, 2.0])
+    assert "2.00x faster" in TimingStats(number=1, repeat=2, timings=[1.0, 1.0]).compare(baseline)
+
+
+@pytest.mark.usefixtures("testapp")
+def test_time_code_without_query_cache_keeps_shell_querysets():
+    from django.contrib.auth.models import User
+
+    users = User.objects.all()
+    list(users)
+    namespace = {"users": users}
+    time_code("list(users)", {}, dict(namespace), number=2, repeat=1, query_cache=False)
+    assert namespace["users"] is users
+    assert users._result_cache == []
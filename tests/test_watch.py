@@ -0,0 +1,77 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from django_tui.management.commands.tui import DjangoTui
+from django_tui.watch import FileWatcher, Polling, WatchIndex, build_index
+
+
+def test_polling_reports_changed_files(tmp_path):
+    path = tmp_path / "commands.py"
+    path.write_text("")
+    backend = Polling({str(tmp_path)})
+    assert backend.read(0) == set()
+
+    os.utime(path, (0, 0))
+    (tmp_path / "models.py").write_text("")
+    assert backend.read(0) == {str(path), str(tmp_path / "models.py")}
+    assert backend.read(0) == set()
+
+
+def test_watcher_calls_back(tmp_path):
+    changes = []
+    changed = threading.Event()
+
+    def callback(paths):
+        changes.append(paths)
+        changed.set()
+
+    watcher = FileWatcher(WatchIndex({}, {str(tmp_path): "testapp"}, {}), callback)
+    watcher.debounce = 0.05
+    watcher.start()
+    try:
+        (tmp_path / "notes.txt").write_text("")
+        (tmp_path / "hello.py").write_text("")
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
+        watcher.join()
+    assert changes == [{str(tmp_path / "hello.py")}]
+
+
+@pytest.mark.usefixtures("testapp")
+def test_build_index():
+    from django.contrib.auth import models
+    from django.contrib.sessions.management.commands import clearsessions
+
+    index = build_index()
+    assert index.commands[clearsessions.__file__] == ("clearsessions", "django.contrib.sessions")
+    assert index.model_modules[models.__file__] == "django.contrib.auth.models"
+    assert os.path.dirname(models.__file__) in index.dirs
+
+
+@pytest.mark.usefixtures("testapp")
+def test_changed_models_need_a_restart(monkeypatch):
+    from django.contrib.auth import models
+    from django.contrib.sessions.management.commands import clearsessions
+
+    reloaded = []
+    messages = []
+
+    async def reload_command(_path, name, app_name):
+        reloaded.append((name, app_name))
+
+    async def run():
+        app = DjangoTui(open_shell=True)
+        async with app.run_test():
+            monkeypatch.setattr(app, "_reload_command", reload_command)
+            monkeypatch.setattr(app, "notify", lambda message, **_kwargs: messages.append(message))
+            app.watcher = SimpleNamespace(index=build_index(), stop=lambda: None)
+            await app.reload_changed({models.__file__, clearsessions.__file__})
+
+    asyncio.run(run())
+    assert reloaded == [("clearsessions", "django.contrib.sessions")]
+    assert messages == ["`django.contrib.auth.models` defines models, restart to pick up changes to models."]